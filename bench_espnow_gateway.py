@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for read_espnow_gateway_serial_v1_1.py.
+
+Synthetic ESP-NOW frames for many sensors are written into a pty that the
+reader (run headless) opens as its serial port, or sent to it as one UDP
+datagram per frame with --udp. Every clean packet carries a
+unique tag in its first two meat values, so its arrival on the reader's SSE
+stream can be matched to the moment it was written. After the run the
+readings in the database are counted against clean packets x readings per
+packet; a shortfall on either side counts as dropped.
+"""
+import argparse
+import http.client
+import json
+import os
+import pty
+import random
+import signal
+import socket
+import sqlite3
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tty
+import urllib.request
+
+GATEWAY_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "read_espnow_gateway_serial_v1_1.py")
+
+START_MAGIC = b'\x55\xAA'
+END_MAGIC   = b'\xAA\x55'
+BUFFER_SIZE = 5
+BATCH_HEADER = struct.Struct("<BBBH")   # batch packets: packetId, sensorId, count, interval (0.1 s)
+TICK_SEC = 0.01
+RESERVED_IDS = {0x55, 0xAA, 0xFF}   # never used as sensor ids: magic bytes and HEARTBEAT_ID
+
+
+# ================= FRAME GENERATION =================
+class LoadGenerator:
+    """
+    Builds frames for `sensors` simulated probes with optional corruption.
+
+    readings=0 sends fixed BUFFER_SIZE packets; otherwise every packet is a
+    batch packet carrying that many readings, `interval` seconds apart.
+    Sensors take turns in a fixed order like real periodic probes, and a
+    lost packet still uses its sensor's turn.
+    """
+
+    def __init__(self, sensors, truncate=0.0, stray_magic=0.0, gaps=0.0, duplicates=0.0, readings=0, seed=None,
+                 interval=2.0):
+        self.rng = random.Random(seed)
+        self.sensor_ids = [i for i in range(1, 255) if i not in RESERVED_IDS][:sensors]
+        self.next_packet_id = {s: 0 for s in self.sensor_ids}
+        self.order = self.rng.sample(self.sensor_ids, len(self.sensor_ids))
+        self.turn = 0
+        self.losing = {}        # sensor -> turns left in its current run of lost packets
+        self.unrevealed = {}    # sensor -> lost ids no later packet has revealed yet
+        self.truncate = truncate
+        self.stray_magic = stray_magic
+        self.gaps = gaps
+        self.duplicates = duplicates
+        self.readings = readings
+        self.interval_tenths = round(interval * 10)   # 0: the reader falls back to --read-interval
+        self.last_clean = None
+        self.tag = 0
+        self.sent = {}          # (sensor, tag) -> write time of clean packets
+        self.counts = {"clean": 0, "truncated": 0, "stray_magic": 0, "skipped_ids": 0, "detectable": 0, "duplicates": 0}
+
+    def frame(self):
+        if self.last_clean and self.rng.random() < self.duplicates:
+            # A retransmit: the reader must drop it, so it carries no new tag
+            self.counts["duplicates"] += 1
+            return self.last_clean, None
+
+        sensor = self.order[self.turn % len(self.order)]
+        self.turn += 1
+        if not self.losing.get(sensor) and self.rng.random() < self.gaps:
+            self.losing[sensor] = self.rng.randint(1, 3)
+        if self.losing.get(sensor):
+            # Lost on the air: the id is used up but nothing reaches the reader
+            self.losing[sensor] -= 1
+            self.next_packet_id[sensor] = (self.next_packet_id[sensor] + 1) % 256
+            self.counts["skipped_ids"] += 1
+            if sensor in self.unrevealed:
+                self.unrevealed[sensor] += 1
+            return b"", None
+        # The reader can only see a gap between two packets it received
+        self.counts["detectable"] += self.unrevealed.get(sensor, 0)
+        self.unrevealed[sensor] = 0
+        packet_id = self.next_packet_id[sensor]
+        self.next_packet_id[sensor] = (packet_id + 1) % 256
+
+        self.tag += 1
+        tag_hi, tag_lo = divmod(self.tag, 1000)
+        # Multiples of 5 tenths survive the gateway's half-degree rounding exactly
+        while True:
+            values = [tag_hi * 5, self.rng.randint(600, 3000)]
+            values += [tag_lo * 5, self.rng.randint(600, 3000)]
+            count = self.readings or BUFFER_SIZE
+            values += [self.rng.randint(600, 3000) for _ in range(2 * count - 4)]
+            if self.readings:
+                header = BATCH_HEADER.pack(packet_id, sensor, count, self.interval_tenths)
+            else:
+                header = struct.pack('<BB', packet_id, sensor)
+            payload = header + struct.pack(f'<{2 * count}h', *values)
+            if START_MAGIC not in payload and END_MAGIC not in payload:
+                break
+
+        r = self.rng.random()
+        if r < self.truncate:
+            self.counts["truncated"] += 1
+            return START_MAGIC + payload[:self.rng.randint(0, len(payload) - 1)], None
+        if r < self.truncate + self.stray_magic:
+            self.counts["stray_magic"] += 1
+            cut = self.rng.randint(2, len(payload) - 2)
+            return START_MAGIC + payload[:cut] + END_MAGIC + payload[cut:] + END_MAGIC, None
+        self.counts["clean"] += 1
+        self.last_clean = START_MAGIC + payload + END_MAGIC
+        return self.last_clean, (sensor, tag_hi * 0.5, tag_lo * 0.5)
+
+
+# ================= READER SIDE =================
+class StreamListener(threading.Thread):
+    """Records when each tagged packet shows up on the reader's /api/stream."""
+
+    def __init__(self, port, readings_per_packet):
+        super().__init__(daemon=True)
+        self.port = port
+        self.step = readings_per_packet
+        self.received = {}    # (sensor, tag_hi, tag_lo) -> arrival time
+        self.last_event = None
+
+    def run(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port)
+        conn.request("GET", "/api/stream")
+        resp = conn.getresponse()
+        while True:
+            line = resp.readline()
+            if not line:
+                return
+            if not line.startswith(b"data: "):
+                continue
+            now = time.monotonic()
+            event = json.loads(line[6:])
+            meat = event["meat"]
+            for i in range(0, len(meat) - 1, self.step):
+                self.received.setdefault((event["sensor"], meat[i], meat[i + 1]), now)
+            self.last_event = now
+
+
+def free_port(kind=socket.SOCK_STREAM):
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_json(port, path):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as r:
+        return json.load(r)
+
+
+def wait_for_http(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return get_json(port, "/api/snapshot?minutes=0")
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Reader did not start its HTTP server")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+# ================= BENCHMARK =================
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="espnow_bench_")
+    db_path = os.path.join(workdir, "bench.db")
+    http_port = free_port()
+
+    # The reader rebuilds reading times from the interval a packet claims. A
+    # sensor that sends faster than its packets span would overlap itself,
+    # so the claimed interval follows each sensor's share of the rate.
+    readings_per_packet = args.readings or BUFFER_SIZE
+    interval = args.sensors / args.rate / readings_per_packet
+
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    cmd = [sys.executable, GATEWAY_SCRIPT, "--headless", "--http-port", str(http_port), "--db", db_path]
+    for sensor in LoadGenerator(args.sensors).sensor_ids:
+        cmd += ["--read-interval", f"{sensor}={interval}"]
+    if args.udp:
+        udp_addr = ("127.0.0.1", free_port(socket.SOCK_DGRAM))
+        udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        cmd += ["--udp", "%s:%d" % udp_addr]
+    else:
+        cmd += ["--port", os.ttyname(slave)]
+    gateway = subprocess.Popen(cmd, stdout=subprocess.DEVNULL if not args.verbose else None)
+
+    try:
+        wait_for_http(http_port)
+        listener = StreamListener(http_port, readings_per_packet)
+        listener.start()
+        time.sleep(args.settle)   # the reader waits for the ESP32 reset after opening the port
+
+        gen = LoadGenerator(args.sensors, args.truncate, args.stray_magic, args.gaps, args.duplicates,
+                            args.readings, args.seed, interval)
+        print(f"Sending {args.rate:.0f} packets/s from {args.sensors} sensors for {args.duration:.0f}s "
+              f"({interval:.3g}s between readings) ...")
+        start = time.monotonic()
+        due = 0.0
+        bytes_sent = 0
+        while True:
+            now = time.monotonic()
+            elapsed = now - start
+            if elapsed >= args.duration:
+                break
+            target = int(elapsed * args.rate) + 1
+            out = bytearray()
+            tags = []
+            while due < target:
+                frame, tag = gen.frame()
+                if frame and args.udp:
+                    udp_sock.sendto(frame, udp_addr)
+                else:
+                    out += frame
+                bytes_sent += len(frame)
+                if tag:
+                    tags.append(tag)
+                due += 1
+            if out:
+                os.write(master, out)
+            if tags:
+                sent_at = time.monotonic()
+                for tag in tags:
+                    gen.sent[tag] = sent_at
+            time.sleep(TICK_SEC)
+        send_time = time.monotonic() - start
+
+        # Let the reader catch up until its stream goes quiet
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < args.drain:
+            last = listener.last_event
+            if last and last > quiet_since:
+                quiet_since = last
+            time.sleep(0.1)
+        total_time = time.monotonic() - start
+        stats = get_json(http_port, "/api/snapshot?minutes=0")["stats"]
+    finally:
+        gateway.send_signal(signal.SIGINT)
+        gateway.wait(timeout=30)
+        os.close(master)
+        os.close(slave)
+        if args.udp:
+            udp_sock.close()
+
+    with sqlite3.connect(db_path) as conn:
+        persisted = conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+
+    latencies = sorted((listener.received[k] - t) * 1000 for k, t in gen.sent.items() if k in listener.received)
+    clean = gen.counts["clean"]
+    delivered = len(latencies)
+    expected_rows = clean * readings_per_packet
+    stream_loss = 1 - delivered / clean if clean else 0.0
+    storage_loss = max(0, expected_rows - persisted) / expected_rows if expected_rows else 0.0
+    storage = stats.get("stages", {}).get("storage", {})
+    # Throughput over the span in which packets actually arrived
+    active = (max(listener.received.values()) - start) if listener.received else total_time
+    print()
+    print("===== GATEWAY BENCHMARK =====")
+    sent = int(due) - gen.counts["skipped_ids"]
+    print(f"Frames sent      : {sent} in {send_time:.1f}s ({sent / send_time:.0f}/s) "
+          f"- clean {clean}, truncated {gen.counts['truncated']}, stray magic {gen.counts['stray_magic']}, "
+          f"skipped ids {gen.counts['skipped_ids']} ({gen.counts['detectable']} between received packets), duplicates {gen.counts['duplicates']}")
+    if args.udp:
+        print(f"Network load     : {bytes_sent / send_time:.0f} B/s in {sent / send_time:.0f} datagrams/s")
+    else:
+        # A pty has no baud limit; 10 bits per byte on a real 8N1 UART
+        print(f"Line load        : {bytes_sent / send_time:.0f} B/s = "
+              f"{bytes_sent / send_time * 10 / args.baud * 100:.0f}% of a {args.baud}-baud UART")
+    print(f"Clean delivered  : {delivered}/{clean} ({delivered / active:.0f} packets/s sustained)")
+    print(f"Rows persisted   : {persisted}/{expected_rows} expected ({persisted / active:.0f}/s), "
+          f"rejected {storage.get('rows_rejected')}, dropped {storage.get('rows_dropped')}")
+    print(f"Drop rate        : {max(stream_loss, storage_loss) * 100:.2f}% "
+          f"(stream {stream_loss * 100:.2f}% of clean packets, storage {storage_loss * 100:.2f}% of expected rows)")
+    print(f"Latency (ms)     : p50 {percentile(latencies, 50):.1f}  p90 {percentile(latencies, 90):.1f}  "
+          f"p99 {percentile(latencies, 99):.1f}  max {percentile(latencies, 100):.1f}")
+    print(f"Reader stats     : received {stats.get('packets_received')}, missing {stats.get('packets_missing')}, "
+          f"malformed {stats.get('packets_malformed')}, duplicate {stats.get('packets_duplicate')}, "
+          f"bytes discarded {stats.get('bytes_discarded')}")
+    print("=============================")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic load benchmark for the ESP-NOW gateway reader")
+    parser.add_argument("--sensors", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=200, help="Total packets per second (default 200)")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of traffic (default 20)")
+    parser.add_argument("--truncate", type=float, default=0.0, help="Fraction of truncated frames")
+    parser.add_argument("--stray-magic", type=float, default=0.0,
+                        help="Fraction of frames with END_MAGIC injected into the payload")
+    parser.add_argument("--gaps", type=float, default=0.0, help="Fraction of turns that start a run of 1-3 lost packets (skipped ids)")
+    parser.add_argument("--duplicates", type=float, default=0.0,
+                        help="Fraction of frames that repeat the previous clean frame")
+    parser.add_argument("--readings", type=int, default=0,
+                        help="Send batch packets with this many readings instead of fixed-size packets")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--baud", type=int, default=115200, help="UART speed the line load is compared to")
+    parser.add_argument("--udp", action="store_true", help="Send every frame as a UDP datagram instead of a pty")
+    parser.add_argument("--settle", type=float, default=2.5, help="Seconds to wait after the reader starts")
+    parser.add_argument("--drain", type=float, default=3.0, help="Quiet seconds that end the run")
+    parser.add_argument("--verbose", action="store_true", help="Show the reader's console output")
+    args = parser.parse_args()
+    if len([i for i in range(1, 255) if i not in RESERVED_IDS]) < args.sensors:
+        parser.error("too many sensors")
+    if args.readings and not 2 <= args.readings <= 255:
+        parser.error("--readings must be between 2 and 255")
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
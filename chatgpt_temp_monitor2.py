@@ -6,11 +6,15 @@ import os
 import sqlite3
 import sys
 #import logging
-import requests
-import json
-from collections import deque
 from datetime import date
 from sendtelegrammessage import send_message
+from smoker_poller import ThermometerPoller, THERMOMETER_URL
+from smoker_scheduler import FixedRateScheduler, BackgroundWorker
+from smoker_stats import ProbeStats
+from smoker_filter import make_filters
+from smoker_eta import CookPredictor
+from smoker_status import StatusWriter
+from smoker_alerts import AlertEngine, windowed_rate
 
 # ------------------- Config -------------------
 #CALIBRATION_OFFSETS = {'meat': -3, 'fire': -3.3, 'air1': 0.1, 'air2': -0.4}
@@ -18,15 +22,23 @@ CALIBRATION_OFFSETS = {'meat': 0, 'fire': 0, 'air1': 0, 'air2': 0}
 
 SAMPLING_INTERVAL_SECONDS = 1
 ROLLING_AVG_PERIOD_SECONDS = 60
+ROLLING_WINDOWS_SECONDS = (ROLLING_AVG_PERIOD_SECONDS, 5 * 60, 15 * 60)
+FILTER_NOISE = {}  # per-probe (process, measurement) noise overrides, e.g. {'fire': (2e-3, 4.0)}
 TELEGRAM_UPDATE_MINUTES = 30
 DB_DIR = "databases"
 LOG_DIR = "logs"
 TEMP_LIMITS_FILE = "temp_limits.json"
 FORCE_CLI = True  # Always show CLI bars
+FETCH_ALERT_FAILURES = 3  # consecutive failed polls before a Telegram error
 
-# ------------------- Rolling Buffers -------------------
-meat_temps = deque(maxlen=ROLLING_AVG_PERIOD_SECONDS)
-fire_temps = deque(maxlen=ROLLING_AVG_PERIOD_SECONDS)
+# ------------------- Rolling Stats -------------------
+# Windows are in seconds of sample time, so failed polls don't stretch them
+meat_stats = ProbeStats(ROLLING_WINDOWS_SECONDS)
+fire_stats = ProbeStats(ROLLING_WINDOWS_SECONDS)
+# Displays and Telegram use the filtered temperature, which follows changes within a few samples
+filters = make_filters(FILTER_NOISE)
+cook = CookPredictor()   # meat ETA to meat_upper and stall detection
+status = StatusWriter()  # live temps for telegram_listener.py; temp_limits.json only holds limits
 
 # ------------------- Logging -------------------
 os.makedirs(DB_DIR, exist_ok=True)
@@ -52,7 +64,8 @@ args, unknown = parser.parse_known_args()
 
 # ------------------- DB Setup -------------------
 db_path = os.path.join(DB_DIR, args.db_filename.strip())
-conn = sqlite3.connect(db_path)
+# Only the background worker writes after setup
+conn = sqlite3.connect(db_path, check_same_thread=False)
 c = conn.cursor()
 c.execute("""
 CREATE TABLE IF NOT EXISTS smoker_test (
@@ -69,30 +82,31 @@ conn.commit()
 # ------------------- Global State -------------------
 last_telegram_time = 0
 start_time = time.time()
+poller = ThermometerPoller(THERMOMETER_URL)
+fetch_alert_sent = False
+# Limit alerts; rules and limits are re-read whenever temp_limits.json changes
+alerts = AlertEngine(TEMP_LIMITS_FILE, defaults={'fire_upper': args.fire_upper, 'fire_lower': args.fire_lower,
+                                                 'meat_upper': args.meat_upper})
+scheduler = FixedRateScheduler(SAMPLING_INTERVAL_SECONDS)
+worker = BackgroundWorker("smoker-io")   # DB, files, JSON and Telegram, off the sampling path
 
 # ------------------- Helper Functions -------------------
 def send_message_safe(message):
     try:
         send_message(message)
     except Exception as e:
-        logging.error(f"Failed to send Telegram message: {e}")
-
-def get_thermometer_data(url="http://192.168.254.25", retries=3, delay=2):
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            data_text = response.text.strip()
-            values = [float(x) for x in data_text.split(",")]
-            if len(values) != 4:
-                raise ValueError("Expected 4 values from thermometer")
-            return values
-        except Exception as e:
-            logging.warning(f"Attempt {attempt + 1} failed: {e}")
-            time.sleep(delay)
-    logging.error("Failed to get thermometer data after retries")
-    send_message_safe("ERROR: Unable to fetch thermometer data after multiple attempts.")
-    return None
+        print(f"\nFailed to send Telegram message: {e}")
+
+def get_thermometer_data():
+    """One poll of the thermometer; None while it is unreachable or backing off."""
+    global fetch_alert_sent
+    values = poller.poll()
+    if values is not None:
+        fetch_alert_sent = False
+    elif poller.stats.consecutive_failures >= FETCH_ALERT_FAILURES and not fetch_alert_sent:
+        fetch_alert_sent = True
+        worker.submit(send_message_safe, f"ERROR: Unable to fetch thermometer data: {poller.stats.last_error}")
+    return values
 
 def render_temp_bar(current, lower, upper, meat=False, length=30):
     if current is None or math.isnan(current):
@@ -123,20 +137,6 @@ def render_temp_bar(current, lower, upper, meat=False, length=30):
 
     return color + "█" * filled_length + RESET + "░" * empty_length
 
-def update_temp_limits_json(fire_avg, meat_avg):
-    try:
-        if os.path.exists(TEMP_LIMITS_FILE):
-            with open(TEMP_LIMITS_FILE, "r") as f:
-                data = json.load(f)
-        else:
-            data = {}
-        data['fire_avg'] = fire_avg
-        data['meat_avg'] = meat_avg
-        with open(TEMP_LIMITS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        logging.error(f"Failed to update temp_limits.json: {e}")
-
 def print_temp_line(avg_meat, avg_fire, elapsed_minutes, meat_bar, fire_bar):
     line = f"MEAT {avg_meat:6.1f}F [{meat_bar}]  FIRE {avg_fire:6.1f}F [{fire_bar}]  Time {elapsed_minutes:6.2f} min"
     # Clear the line first
@@ -144,8 +144,10 @@ def print_temp_line(avg_meat, avg_fire, elapsed_minutes, meat_bar, fire_bar):
     sys.stdout.write(line)
     sys.stdout.flush()
 
-def print_temp_line(avg_meat, avg_fire, elapsed_minutes, meat_bar, fire_bar, line_length=120):
-    line = f"MEAT {avg_meat:6.1f}F [{meat_bar}]  FIRE {avg_fire:6.1f}F [{fire_bar}]  Time {elapsed_minutes:6.2f} min"
+def print_temp_line(meat, meat_rate, fire, fire_rate, elapsed_minutes, meat_bar, fire_bar, line_length=160):
+    line = (f"MEAT {meat:6.1f}F {meat_rate:+5.1f}/m [{meat_bar}]  FIRE {fire:6.1f}F {fire_rate:+5.1f}/m [{fire_bar}]  "
+            f"Time {elapsed_minutes:6.2f} min  {cook.summary(alerts.limits['meat_upper'])}  "
+            f"Ticks {scheduler.late} late {scheduler.missed} missed")
     # Pad the line to overwrite previous longer content
     padded_line = line.ljust(line_length)
     # Clear the line first
@@ -154,7 +156,7 @@ def print_temp_line(avg_meat, avg_fire, elapsed_minutes, meat_bar, fire_bar, lin
     sys.stdout.flush()
 
 def collect_data(elapsed_minutes):
-    global meat_temps, fire_temps, last_telegram_time
+    global last_telegram_time
 
     data = get_thermometer_data()
     if not data:
@@ -166,40 +168,75 @@ def collect_data(elapsed_minutes):
     air1 = round(air1_raw + CALIBRATION_OFFSETS['air1'], 1)
     air2 = round(air2_raw + CALIBRATION_OFFSETS['air2'], 1)
 
-    meat_temps.append(meat_temp)
-    fire_temps.append(fire_temp)
+    sample_ts = elapsed_minutes * 60
+    meat_stats.add(sample_ts, meat_temp)
+    fire_stats.add(sample_ts, fire_temp)
 
-    avg_meat = sum(meat_temps)/len(meat_temps)
-    avg_fire = sum(fire_temps)/len(fire_temps)
+    avg_meat = meat_stats[ROLLING_AVG_PERIOD_SECONDS].mean
+    avg_fire = fire_stats[ROLLING_AVG_PERIOD_SECONDS].mean
+    meat, meat_rate = filters['meat'].update(sample_ts, meat_temp)
+    fire, fire_rate = filters['fire'].update(sample_ts, fire_temp)
+    was_stalled = cook.stalled
+    cook.update(sample_ts, meat_temp)
 
-    meat_bar = render_temp_bar(avg_meat, 40, args.meat_upper, meat=True)
-    fire_bar = render_temp_bar(avg_fire, args.fire_lower, args.fire_upper, meat=False)
+    limits = alerts.limits
+    meat_bar = render_temp_bar(meat, 40, limits['meat_upper'], meat=True)
+    fire_bar = render_temp_bar(fire, limits['fire_lower'], limits['fire_upper'], meat=False)
 
     # Print live CLI output (force display)
     #print(f"MEAT {avg_meat:6.1f}F [{meat_bar}]  FIRE {avg_fire:6.1f}F [{fire_bar}]  Time {elapsed_minutes:6.2f} min", end="\r", flush=True)
     #print(f"MEAT {avg_meat:6.1f}F [{meat_bar}]  FIRE {avg_fire:6.1f}F [{fire_bar}]  Time {elapsed_minutes:6.2f} min", end="\r", flush=True)
-    print_temp_line(avg_meat, avg_fire, elapsed_minutes, meat_bar, fire_bar)
+    print_temp_line(meat, meat_rate, fire, fire_rate, elapsed_minutes, meat_bar, fire_bar)
+
+    # DB insert and the live status file are written on the worker thread
+    worker.submit(store_sample, elapsed_minutes, avg_meat, avg_fire, air1, air2)
+    worker.submit(status.publish, avg_meat, avg_fire, meat, fire, meat_rate, fire_rate,
+                  cook.eta_seconds(limits['meat_upper']), limits['meat_upper'], cook.stalled)
+
+    # Limit alerts (batched by the engine) and a one-off stall notice
+    # Rate rules use the 1-minute slope; the filter rate is too noisy on the fire probe
+    alert = alerts.evaluate(time.monotonic(), {'meat': meat, 'fire': fire,
+                                               'meat_rate': windowed_rate(meat_stats[ROLLING_AVG_PERIOD_SECONDS]),
+                                               'fire_rate': windowed_rate(fire_stats[ROLLING_AVG_PERIOD_SECONDS])})
+    if alert:
+        worker.submit(send_message_safe, alert)
+    if cook.stalled and not was_stalled:
+        worker.submit(send_message_safe, f"MEAT stalled at {cook.level:.1f}F ({cook.rate:+.2f}F/min)")
 
+    # Send Telegram every TELEGRAM_UPDATE_MINUTES
+    if elapsed_minutes - last_telegram_time >= TELEGRAM_UPDATE_MINUTES:
+        last_telegram_time = elapsed_minutes
+        worker.submit(send_message_safe, f"MEAT {meat:6.1f}F ({meat_rate:+.1f}F/min)  FIRE {fire:6.1f}F ({fire_rate:+.1f}F/min)  "
+                                         f"Time {elapsed_minutes:6.2f} min\n"
+                                         f"MEAT {cook.summary(limits['meat_upper'])} to {limits['meat_upper']:.0f}F\n"
+                                         f"{window_summary()}{sampling_summary()}")
 
-    # Insert into DB
+    return (avg_meat, avg_fire, air1, air2)
+
+def window_summary():
+    """Longer-window view of the fire for the periodic Telegram update."""
+    lines = []
+    for seconds in ROLLING_WINDOWS_SECONDS[1:]:
+        fire = fire_stats[seconds]
+        lines.append(f"FIRE {seconds // 60}m: avg {fire.mean:.1f}F, {fire.min:.1f}-{fire.max:.1f}F, sd {fire.std:.1f}")
+    return "\n".join(lines)
+
+def sampling_summary():
+    """Late or missed sampling ticks for the periodic Telegram update; empty while there are none."""
+    if not (scheduler.late or scheduler.missed):
+        return ""
+    return (f"\nSampling: {scheduler.late} late, {scheduler.missed} missed ticks "
+            f"(max {scheduler.max_late_ms:.0f} ms late)")
+
+def store_sample(elapsed_minutes, avg_meat, avg_fire, air1, air2):
     try:
         c.execute("INSERT INTO smoker_test (minutes, meat_temp, fire_temp, air1, air2, notes) VALUES (?, ?, ?, ?, ?, ?)",
                   (elapsed_minutes, avg_meat, avg_fire, air1, air2, args.notes))
         conn.commit()
     except sqlite3.Error as e:
-        logging.error(f"Database insert error: {e}")
+        print(f"\nDatabase insert error: {e}")
         conn.rollback()
 
-    # Update rolling-average in JSON
-    update_temp_limits_json(avg_fire, avg_meat)
-
-    # Send Telegram every TELEGRAM_UPDATE_MINUTES
-    if elapsed_minutes - last_telegram_time >= TELEGRAM_UPDATE_MINUTES:
-        last_telegram_time = elapsed_minutes
-        send_message_safe(f"MEAT {avg_meat:6.1f}F  FIRE {avg_fire:6.1f}F  Time {elapsed_minutes:6.2f} min")
-
-    return (avg_meat, avg_fire, air1, air2)
-
 def save_data(datapoint, filename):
     if datapoint is None:
         return
@@ -207,31 +244,38 @@ def save_data(datapoint, filename):
         with open(f'{filename}.txt', 'a') as f:
             print(datapoint, file=f)
     except IOError as e:
-        logging.error(f"Failed to write to file {filename}.txt: {e}")
+        print(f"\nFailed to write to file {filename}.txt: {e}")
 
 def setup_files():
     filename = date.today().strftime("%Y-%m-%d")
     try:
         open(f'{filename}.txt', 'a').close()
     except IOError as e:
-        logging.error(f"Failed to open data file {filename}.txt: {e}")
+        print(f"Failed to open data file {filename}.txt: {e}")
     return filename
 
 def thermometer_main():
     filename = setup_files()
-    global start_time
     try:
-        while True:
-            elapsed_min = (time.time() - start_time)/60
-            datapoint = collect_data(elapsed_min)
-            save_data(datapoint, filename)
-            time.sleep(SAMPLING_INTERVAL_SECONDS)
+        # Samples land on a fixed grid: elapsed time is the tick's nominal offset
+        for tick, offset in scheduler:
+            datapoint = collect_data(offset / 60)
+            if datapoint is not None:
+                worker.submit(save_data, datapoint, filename)
     except KeyboardInterrupt:
-        logging.info("Terminated by user.")
+        print("\nTerminated by user.")
     except Exception as e:
-        logging.error(f"Unexpected error in main loop: {e}")
+        print(f"\nUnexpected error in main loop: {e}")
         send_message_safe(f"ERROR: Script crashed: {e}")
         time.sleep(10)
+    finally:
+        alert = alerts.flush()
+        if alert:
+            worker.submit(send_message_safe, alert)
+        worker.close()
+        print(f"\nThermometer {poller.stats.summary()}")
+        print(f"Sampling {scheduler.summary()}, {worker.dropped} side jobs dropped")
+        poller.close()
 
 # ------------------- Run -------------------
 if __name__ == "__main__":
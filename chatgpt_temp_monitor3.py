@@ -5,11 +5,17 @@ import math
 import os
 import sqlite3
 import sys
-import requests
-import json
+import threading
 from collections import deque
 from datetime import date
 from sendtelegrammessage import send_message
+from smoker_poller import ThermometerPoller, THERMOMETER_URL
+from smoker_scheduler import FixedRateScheduler, BackgroundWorker
+from smoker_stats import ProbeStats
+from smoker_filter import make_filters
+from smoker_eta import CookPredictor
+from smoker_status import StatusWriter
+from smoker_alerts import AlertEngine, windowed_rate
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 
@@ -17,16 +23,23 @@ import matplotlib.animation as animation
 CALIBRATION_OFFSETS = {'meat': 0, 'fire': 0, 'air1': 0, 'air2': 0}
 SAMPLING_INTERVAL_SECONDS = 1
 ROLLING_AVG_PERIOD_SECONDS = 60
+ROLLING_WINDOWS_SECONDS = (ROLLING_AVG_PERIOD_SECONDS, 5 * 60, 15 * 60)
+FILTER_NOISE = {}  # per-probe (process, measurement) noise overrides, e.g. {'fire': (2e-3, 4.0)}
 TELEGRAM_UPDATE_MINUTES = 30
+PLOT_REFRESH_SECONDS = 0.5
 DB_DIR = "databases"
 TEMP_LIMITS_FILE = "temp_limits.json"
 FORCE_CLI = True  # Always show CLI bars
+FETCH_ALERT_FAILURES = 3  # consecutive failed polls before a Telegram error
 
-# ------------------- Rolling Buffers -------------------
-meat_temps = deque(maxlen=ROLLING_AVG_PERIOD_SECONDS)
-fire_temps = deque(maxlen=ROLLING_AVG_PERIOD_SECONDS)
-success_count = 0
-attempt_count = 0
+# ------------------- Rolling Stats -------------------
+# Windows are in seconds of sample time, so failed polls don't stretch them
+meat_stats = ProbeStats(ROLLING_WINDOWS_SECONDS)
+fire_stats = ProbeStats(ROLLING_WINDOWS_SECONDS)
+# Displays and Telegram use the filtered temperature, which follows changes within a few samples
+filters = make_filters(FILTER_NOISE)
+cook = CookPredictor()   # meat ETA to meat_upper and stall detection
+status = StatusWriter()  # live temps for telegram_listener.py; temp_limits.json only holds limits
 
 # ------------------- DB Setup -------------------
 parser = argparse.ArgumentParser(description="Smoker Temperature Monitor")
@@ -39,7 +52,7 @@ args, unknown = parser.parse_known_args()
 
 db_path = os.path.join(DB_DIR, args.db_filename.strip())
 os.makedirs(DB_DIR, exist_ok=True)
-conn = sqlite3.connect(db_path)
+conn = sqlite3.connect(db_path, check_same_thread=False)  # written by the worker thread
 c = conn.cursor()
 c.execute("""
 CREATE TABLE IF NOT EXISTS smoker_test (
@@ -56,6 +69,15 @@ conn.commit()
 # ------------------- Global State -------------------
 last_telegram_time = 0
 start_time = time.time()
+poller = ThermometerPoller(THERMOMETER_URL)
+fetch_alert_sent = False
+# Limit alerts; rules and limits are re-read whenever temp_limits.json changes
+alerts = AlertEngine(TEMP_LIMITS_FILE, defaults={'fire_upper': args.fire_upper, 'fire_lower': args.fire_lower,
+                                                 'meat_upper': args.meat_upper})
+scheduler = FixedRateScheduler(SAMPLING_INTERVAL_SECONDS)
+worker = BackgroundWorker("smoker-io")   # DB, JSON and Telegram, off the sampling path
+plot_points = deque()                    # (elapsed_sec, meat, fire) from the sampling thread
+sampling_stopped = threading.Event()     # set if the sampling thread dies; ends the plot loop too
 
 # ------------------- Helper Functions -------------------
 def send_message_safe(message):
@@ -64,21 +86,16 @@ def send_message_safe(message):
     except Exception as e:
         print(f"Telegram send failed: {e}")
 
-def get_thermometer_data(url="http://192.168.254.25", retries=3, delay=2):
-    global attempt_count, success_count
-    attempt_count += 1
-    for _ in range(retries):
-        try:
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
-            values = [float(x) for x in response.text.strip().split(",")]
-            if len(values) != 4:
-                raise ValueError("Expected 4 values from thermometer")
-            success_count += 1
-            return values
-        except Exception as e:
-            time.sleep(delay)
-    return None
+def get_thermometer_data():
+    """One poll of the thermometer; None while it is unreachable or backing off."""
+    global fetch_alert_sent
+    values = poller.poll()
+    if values is not None:
+        fetch_alert_sent = False
+    elif poller.stats.consecutive_failures >= FETCH_ALERT_FAILURES and not fetch_alert_sent:
+        fetch_alert_sent = True
+        worker.submit(send_message_safe, f"ERROR: Unable to fetch thermometer data: {poller.stats.last_error}")
+    return values
 
 def render_temp_bar(current, lower, upper, meat=False, length=30):
     if current is None or math.isnan(current):
@@ -96,20 +113,15 @@ def render_temp_bar(current, lower, upper, meat=False, length=30):
         else: color = RED
     return color + "█" * filled_length + RESET + "░" * empty_length
 
-def print_temp_line(avg_meat, avg_fire, elapsed_minutes, meat_bar, fire_bar, line_length=140):
-    success_pct = 100 * success_count / attempt_count if attempt_count else 0
-    line = f"MEAT {avg_meat:5.1f}F [{meat_bar}]  FIRE {avg_fire:5.1f}F [{fire_bar}]  Time {elapsed_minutes:6.2f} min  Success {success_pct:5.1f}%"
+def print_temp_line(meat, meat_rate, fire, fire_rate, elapsed_minutes, meat_bar, fire_bar, line_length=160):
+    stats = poller.stats
+    line = (f"MEAT {meat:5.1f}F {meat_rate:+4.1f}/m [{meat_bar}]  FIRE {fire:5.1f}F {fire_rate:+4.1f}/m [{fire_bar}]  "
+            f"Time {elapsed_minutes:6.2f} min  {cook.summary(alerts.limits['meat_upper'])}  "
+            f"Success {stats.success_pct:5.1f}%  {stats.avg_ms:4.0f} ms  "
+            f"Ticks {scheduler.late} late {scheduler.missed} missed")
     sys.stdout.write("\033[2K\r" + line.ljust(line_length))
     sys.stdout.flush()
 
-def update_temp_limits_json(fire_avg, meat_avg):
-    try:
-        data = json.load(open(TEMP_LIMITS_FILE)) if os.path.exists(TEMP_LIMITS_FILE) else {}
-        data['fire_avg'] = fire_avg; data['meat_avg'] = meat_avg
-        json.dump(data, open(TEMP_LIMITS_FILE, "w"), indent=2)
-    except Exception as e:
-        print(f"Failed to update JSON: {e}")
-
 def collect_data(elapsed_minutes):
     data = get_thermometer_data()
     if not data:
@@ -118,24 +130,53 @@ def collect_data(elapsed_minutes):
     fire_temp = round((data[1] + CALIBRATION_OFFSETS['fire']) * 2) / 2
     air1 = round(data[2] + CALIBRATION_OFFSETS['air1'], 1)
     air2 = round(data[3] + CALIBRATION_OFFSETS['air2'], 1)
-    meat_temps.append(meat_temp); fire_temps.append(fire_temp)
-    avg_meat = sum(meat_temps)/len(meat_temps)
-    avg_fire = sum(fire_temps)/len(fire_temps)
-    meat_bar = render_temp_bar(avg_meat, 40, args.meat_upper, meat=True)
-    fire_bar = render_temp_bar(avg_fire, args.fire_lower, args.fire_upper)
-    print_temp_line(avg_meat, avg_fire, elapsed_minutes, meat_bar, fire_bar)
+    meat_stats.add(elapsed_minutes * 60, meat_temp); fire_stats.add(elapsed_minutes * 60, fire_temp)
+    avg_meat = meat_stats[ROLLING_AVG_PERIOD_SECONDS].mean
+    avg_fire = fire_stats[ROLLING_AVG_PERIOD_SECONDS].mean
+    meat, meat_rate = filters['meat'].update(elapsed_minutes * 60, meat_temp)
+    fire, fire_rate = filters['fire'].update(elapsed_minutes * 60, fire_temp)
+    was_stalled = cook.stalled
+    cook.update(elapsed_minutes * 60, meat_temp)
+    limits = alerts.limits
+    meat_bar = render_temp_bar(meat, 40, limits['meat_upper'], meat=True)
+    fire_bar = render_temp_bar(fire, limits['fire_lower'], limits['fire_upper'])
+    print_temp_line(meat, meat_rate, fire, fire_rate, elapsed_minutes, meat_bar, fire_bar)
+    worker.submit(store_sample, elapsed_minutes, avg_meat, avg_fire, air1, air2)
+    worker.submit(status.publish, avg_meat, avg_fire, meat, fire, meat_rate, fire_rate,
+                  cook.eta_seconds(limits['meat_upper']), limits['meat_upper'], cook.stalled)
+    global last_telegram_time
+    # Rate rules use the 1-minute slope; the filter rate is too noisy on the fire probe
+    alert = alerts.evaluate(time.monotonic(), {'meat': meat, 'fire': fire,
+                                               'meat_rate': windowed_rate(meat_stats[ROLLING_AVG_PERIOD_SECONDS]),
+                                               'fire_rate': windowed_rate(fire_stats[ROLLING_AVG_PERIOD_SECONDS])})
+    if alert:
+        worker.submit(send_message_safe, alert)
+    if cook.stalled and not was_stalled:
+        worker.submit(send_message_safe, f"MEAT stalled at {cook.level:.1f}F ({cook.rate:+.2f}F/min)")
+    if elapsed_minutes - last_telegram_time >= TELEGRAM_UPDATE_MINUTES:
+        last_telegram_time = elapsed_minutes
+        fire15 = fire_stats[15 * 60]
+        worker.submit(send_message_safe, f"MEAT {meat:.1f}F ({meat_rate:+.1f}F/min) FIRE {fire:.1f}F ({fire_rate:+.1f}F/min) "
+                                         f"Time {elapsed_minutes:.2f} min\n"
+                                         f"MEAT {cook.summary(limits['meat_upper'])} to {limits['meat_upper']:.0f}F\n"
+                                         f"FIRE 15m {fire15.min}-{fire15.max}F sd {fire15.std:.1f}"
+                                         f"{sampling_summary()}")
+    return meat, fire
+
+def sampling_summary():
+    """Late or missed sampling ticks for the periodic Telegram update; empty while there are none."""
+    if not (scheduler.late or scheduler.missed):
+        return ""
+    return (f"\nSampling: {scheduler.late} late, {scheduler.missed} missed ticks "
+            f"(max {scheduler.max_late_ms:.0f} ms late)")
+
+def store_sample(elapsed_minutes, avg_meat, avg_fire, air1, air2):
     try:
         c.execute("INSERT INTO smoker_test (minutes, meat_temp, fire_temp, air1, air2, notes) VALUES (?, ?, ?, ?, ?, ?)",
                   (elapsed_minutes, avg_meat, avg_fire, air1, air2, args.notes))
         conn.commit()
     except:
         conn.rollback()
-    update_temp_limits_json(avg_fire, avg_meat)
-    global last_telegram_time
-    if elapsed_minutes - last_telegram_time >= TELEGRAM_UPDATE_MINUTES:
-        last_telegram_time = elapsed_minutes
-        send_message_safe(f"MEAT {avg_meat}F FIRE {avg_fire}F Time {elapsed_minutes:.2f} min")
-    return avg_meat, avg_fire
 
 # ------------------- Real-time Plot -------------------
 plt.ion()
@@ -148,30 +189,50 @@ ax.legend()
 ax.grid(True)
 xdata, meat_data, fire_data = [], [], []
 
-def update_plot(avg_meat, avg_fire, elapsed_seconds):
-    xdata.append(elapsed_seconds)
-    meat_data.append(avg_meat)
-    fire_data.append(avg_fire)
+def update_plot():
+    """Draw whatever the sampling thread produced since the last refresh."""
+    while plot_points:
+        elapsed_seconds, meat, fire = plot_points.popleft()
+        xdata.append(elapsed_seconds)
+        meat_data.append(meat)
+        fire_data.append(fire)
     meat_line.set_data(xdata, meat_data)
     fire_line.set_data(xdata, fire_data)
     ax.relim(); ax.autoscale_view()
-    plt.pause(0.001)
+    plt.pause(PLOT_REFRESH_SECONDS)
 
 # ------------------- Main Loop -------------------
+def sampling_loop():
+    try:
+        # Samples land on a fixed grid: elapsed time is the tick's nominal offset
+        for tick, offset in scheduler:
+            datapoint = collect_data(offset / 60)
+            if datapoint:
+                plot_points.append((offset, *datapoint))
+    except Exception as e:
+        print(f"\nUnexpected error in sampling loop: {e}")
+        send_message_safe(f"ERROR: Script crashed: {e}")
+    finally:
+        sampling_stopped.set()
+
 def thermometer_main():
     filename = date.today().strftime("%Y-%m-%d")
     open(f'{filename}.txt', 'a').close()
+    # Sampling runs on its own thread; the plot (which needs the main thread) redraws at its own pace
+    threading.Thread(target=sampling_loop, name="smoker-sampling", daemon=True).start()
     try:
-        while True:
-            elapsed_sec = time.time() - start_time
-            elapsed_min = elapsed_sec / 60
-            datapoint = collect_data(elapsed_min)
-            if datapoint:
-                avg_meat, avg_fire = datapoint
-                update_plot(avg_meat, avg_fire, elapsed_sec)
-            time.sleep(SAMPLING_INTERVAL_SECONDS)
+        while not sampling_stopped.is_set():
+            update_plot()
     except KeyboardInterrupt:
         print("\nTerminated by user.")
+    finally:
+        alert = alerts.flush()
+        if alert:
+            worker.submit(send_message_safe, alert)
+        worker.close()
+        print(f"Thermometer {poller.stats.summary()}")
+        print(f"Sampling {scheduler.summary()}, {worker.dropped} side jobs dropped")
+        poller.close()
 
 # ------------------- Run -------------------
 if __name__ == "__main__":
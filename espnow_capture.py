@@ -0,0 +1,55 @@
+"""Raw serial capture files for the ESP-NOW gateway.
+
+A capture is CAPTURE_MAGIC followed by one record per chunk read from the port:
+a '<dI' header (time.monotonic() seconds, chunk length) and the chunk bytes.
+"""
+import struct
+import time
+
+# ================= CONFIG =================
+CAPTURE_MAGIC = b"ESPCAP1\n"
+RECORD_HEADER = struct.Struct("<dI")
+FLUSH_INTERVAL_SEC = 1.0
+
+
+# ================= WRITER =================
+class CaptureWriter:
+    """Appends stamped chunks to a capture file; flushed about once a second."""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "wb")
+        self._f.write(CAPTURE_MAGIC)
+        self._last_flush = time.monotonic()
+        self.chunks = 0
+        self.bytes = 0
+
+    def write(self, chunk, t=None):
+        now = time.monotonic() if t is None else t
+        self._f.write(RECORD_HEADER.pack(now, len(chunk)))
+        self._f.write(chunk)
+        self.chunks += 1
+        self.bytes += len(chunk)
+        if now - self._last_flush >= FLUSH_INTERVAL_SEC:
+            self._f.flush()
+            self._last_flush = now
+
+    def close(self):
+        self._f.close()
+
+
+# ================= READER =================
+def read_capture(path):
+    """Yield (monotonic_time, chunk) for every record; a truncated last record is skipped."""
+    with open(path, "rb") as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not an ESP-NOW capture file")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            t, length = RECORD_HEADER.unpack(header)
+            chunk = f.read(length)
+            if len(chunk) < length:
+                return
+            yield t, chunk
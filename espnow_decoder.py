@@ -0,0 +1,188 @@
+"""Incremental frame decoder for the ESP-NOW serial gateway."""
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+# ================= CONFIG =================
+START_MAGIC = b'\x55\xAA'
+END_MAGIC   = b'\xAA\x55'
+
+RING_SIZE = 4096       # bytes held by the decoder
+MAX_FRAME_LEN = 1024   # payloads longer than this force a resync
+
+# Batch packets: packetId, sensorId, reading count, reading interval (u16,
+# tenths of a second; 0 = the gateway's setting for that sensor), then
+# count (meat, fire) int16 pairs. Their length is 5 + 4*count, which is never
+# 2 + 4*n, so they can share the link with the fixed BUFFER_SIZE packets.
+BATCH_HEADER = struct.Struct("<BBBH")
+READING_LEN = 4
+
+
+# ================= FRAME DECODER =================
+class FrameDecoder:
+    """
+    Pulls START_MAGIC ... END_MAGIC framed payloads out of a serial byte stream.
+
+    Bytes are copied once into a fixed-size buffer. Payloads are handed out as
+    memoryview slices of that buffer, so they are only valid until the next
+    item is requested from feed(). Scanning resumes where the last call left
+    off instead of rescanning everything that is buffered.
+    """
+
+    def __init__(self, start_magic=START_MAGIC, end_magic=END_MAGIC,
+                 size=RING_SIZE, max_frame_len=MAX_FRAME_LEN):
+        if max_frame_len + len(start_magic) + len(end_magic) > size:
+            raise ValueError("Ring size too small for max_frame_len")
+        self.start_magic = start_magic
+        self.end_magic = end_magic
+        self.size = size
+        self.max_frame_len = max_frame_len
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._head = 0      # first unconsumed byte
+        self._tail = 0      # one past the last written byte
+        self._scan = 0      # where the next END_MAGIC search starts
+        self._in_frame = False  # _head points at a START_MAGIC
+
+        # Counters
+        self.frames = 0
+        self.bytes_in = 0
+        self.bytes_discarded = 0
+        self.resyncs = 0
+
+    def buffered(self):
+        return self._tail - self._head
+
+    def reset(self):
+        """Drop any partial frame, e.g. after the port was reopened."""
+        self.bytes_discarded += self._tail - self._head
+        self._head = self._tail = self._scan = 0
+        self._in_frame = False
+
+    def feed(self, chunk):
+        """Add raw bytes and yield every complete payload as a memoryview."""
+        data = memoryview(chunk)
+        self.bytes_in += len(data)
+        while len(data):
+            n = self._make_room(len(data))
+            self._buf[self._tail:self._tail + n] = data[:n]
+            self._tail += n
+            data = data[n:]
+            yield from self._frames()
+
+    def _make_room(self, wanted):
+        """Rewind leftover bytes to the front of the buffer when the end is reached."""
+        free = self.size - self._tail
+        if free >= wanted or self._head == 0:
+            if free == 0:
+                # Buffer full of one oversized frame; give up on it
+                self._discard(self._tail - self._head)
+                self._head = self._tail = self._scan = 0
+                self._in_frame = False
+                self.resyncs += 1
+                free = self.size
+            return min(free, wanted)
+
+        # Only the partial frame (at most max_frame_len bytes) is moved
+        left = self._tail - self._head
+        self._buf[0:left] = self._buf[self._head:self._tail]
+        self._scan -= self._head
+        self._head, self._tail = 0, left
+        return min(self.size - left, wanted)
+
+    def _discard(self, n):
+        self.bytes_discarded += n
+        self._head += n
+
+    def _frames(self):
+        start_len = len(self.start_magic)
+        end_len = len(self.end_magic)
+        while True:
+            if not self._in_frame:
+                idx = self._buf.find(self.start_magic, self._head, self._tail)
+                if idx == -1:
+                    # Keep a trailing byte that may be half of START_MAGIC
+                    keep = start_len - 1
+                    if self._tail - self._head > keep:
+                        self._discard(self._tail - self._head - keep)
+                    self._scan = self._head
+                    return
+                self._discard(idx - self._head)
+                self._in_frame = True
+                self._scan = self._head + start_len
+
+            end = self._buf.find(self.end_magic, self._scan, self._tail)
+            payload_start = self._head + start_len
+            if end == -1:
+                if self._tail - payload_start > self.max_frame_len + end_len:
+                    # No END_MAGIC in sight: drop this START_MAGIC and look again
+                    self._discard(start_len)
+                    self._in_frame = False
+                    self.resyncs += 1
+                    continue
+                self._scan = max(payload_start, self._tail - end_len + 1)
+                return
+
+            self._in_frame = False
+            self._head = end + end_len
+            self._scan = self._head
+            self.frames += 1
+            yield self._view[payload_start:end]
+
+
+# ================= BATCH DECODING =================
+ReadingBatch = namedtuple(
+    "ReadingBatch", ["packet_id", "sensor_id", "reading_index", "meat", "fire"]
+)
+
+
+def batch_header(payload):
+    """Return (packet_id, sensor_id, count, interval_sec) of a batch packet, or None."""
+    n = len(payload)
+    if n < BATCH_HEADER.size + READING_LEN or (n - BATCH_HEADER.size) % READING_LEN:
+        return None
+    packet_id, sensor_id, count, interval = BATCH_HEADER.unpack_from(payload)
+    if BATCH_HEADER.size + count * READING_LEN != n:
+        return None
+    return packet_id, sensor_id, count, interval / 10
+
+
+class ReadingCollector:
+    """
+    Gathers sensor packets of any length for one vectorized decode.
+
+    add() takes a packet's header fields and a view of its (meat, fire)
+    pairs, which are copied at once, so decoder views may be passed in.
+    The per-packet lists stay available for timestamp reconstruction.
+    """
+
+    def __init__(self):
+        self.packet_ids = []
+        self.sensor_ids = []
+        self.counts = []
+        self.intervals = []
+        self._temps = bytearray()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, packet_id, sensor_id, count, interval, temps):
+        self.packet_ids.append(packet_id)
+        self.sensor_ids.append(sensor_id)
+        self.counts.append(count)
+        self.intervals.append(interval)
+        self._temps += temps
+
+    def decode(self):
+        """Return a ReadingBatch of flat arrays with one entry per reading, in packet order."""
+        counts = np.array(self.counts, dtype=np.int64)
+        temps = np.round(np.frombuffer(self._temps, dtype="<i2") / 5.0) / 2
+        starts = np.cumsum(counts) - counts
+        return ReadingBatch(
+            packet_id=np.repeat(np.array(self.packet_ids, dtype=np.uint8), counts),
+            sensor_id=np.repeat(np.array(self.sensor_ids, dtype=np.uint8), counts),
+            reading_index=np.arange(counts.sum()) - np.repeat(starts, counts),
+            meat=temps[0::2],
+            fire=temps[1::2],
+        )
@@ -0,0 +1,100 @@
+"""Change-compressed heartbeat log for the ESP-NOW gateway.
+
+Heartbeats repeat the same message for hours, so instead of one row each,
+the gateway keeps one row per run of identical messages from a source:
+(first_seen, last_seen, count, message). A row is written when a run
+starts or ends, and refreshed every HEARTBEAT_SUMMARY_SEC while it lasts.
+"""
+import time
+
+# ================= CONFIG =================
+HEARTBEAT_SUMMARY_SEC = 15 * 60   # how often an unchanged run's last_seen/count are persisted
+
+HEARTBEAT_SCHEMA = ["""
+CREATE TABLE IF NOT EXISTS heartbeat_log (
+    gateway_id INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    count INTEGER NOT NULL,
+    message TEXT,
+    PRIMARY KEY (gateway_id, first_seen)
+) WITHOUT ROWID
+""", """
+CREATE VIEW IF NOT EXISTS last_heartbeat AS
+SELECT h.gateway_id, h.message, h.first_seen, h.last_seen, h.count
+FROM heartbeat_log h
+WHERE h.first_seen = (SELECT MAX(first_seen) FROM heartbeat_log WHERE gateway_id = h.gateway_id)
+"""]
+UPSERT_HEARTBEAT = ("INSERT OR REPLACE INTO heartbeat_log (gateway_id, first_seen, last_seen, count, message) "
+                    "VALUES (?, ?, ?, ?, ?)")
+
+
+# ================= TRACKER =================
+class HeartbeatRun:
+    def __init__(self, gateway_id, message, now):
+        self.gateway_id = gateway_id
+        self.message = message
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 1
+        self.written_count = 0
+
+    def row(self):
+        self.written_count = self.count
+        return (self.gateway_id, self.first_seen, self.last_seen, self.count, self.message)
+
+
+class HeartbeatTracker:
+    """
+    Keeps the current heartbeat run per source in memory.
+
+    Heartbeat packets carry no sensor id (the sensor byte is HEARTBEAT_ID,
+    the rest is text), so a source is the gateway input they arrive on.
+    update() returns the UPSERT_HEARTBEAT rows that need writing, usually none.
+    """
+
+    def __init__(self, summary_sec=HEARTBEAT_SUMMARY_SEC):
+        self.summary_sec = summary_sec
+        self.runs = {}            # gateway_id -> HeartbeatRun
+        self.received = 0
+        self.rows_out = 0
+        self._last_write = {}     # gateway_id -> time its row was last returned
+
+    def update(self, gateway_id, message, now=None):
+        now = time.time() if now is None else now
+        self.received += 1
+        run = self.runs.get(gateway_id)
+        if run is not None and run.message == message:
+            run.last_seen = now
+            run.count += 1
+            if now - self._last_write[gateway_id] < self.summary_sec:
+                return []
+            rows = [run.row()]
+        else:
+            # State change: close the old run with its final numbers, open a new one
+            rows = [run.row()] if run is not None and run.count != run.written_count else []
+            run = self.runs[gateway_id] = HeartbeatRun(gateway_id, message, now)
+            rows.append(run.row())
+        self._last_write[gateway_id] = now
+        self.rows_out += len(rows)
+        return rows
+
+    def flush(self):
+        """Rows for runs with heartbeats not persisted yet, e.g. on shutdown."""
+        rows = [run.row() for run in self.runs.values() if run.count != run.written_count]
+        self.rows_out += len(rows)
+        return rows
+
+    def snapshot(self, now=None):
+        now = time.time() if now is None else now
+        return [{"gateway_id": run.gateway_id, "message": run.message, "count": run.count,
+                 "first_seen": run.first_seen, "last_seen": run.last_seen,
+                 "since_last_s": now - run.last_seen}
+                for _, run in sorted(self.runs.items())]
+
+
+def last_heartbeats(conn):
+    """[(gateway_id, message, first_seen, last_seen, count), ...] from the last_heartbeat view."""
+    return conn.execute(
+        "SELECT gateway_id, message, first_seen, last_seen, count FROM last_heartbeat ORDER BY gateway_id"
+    ).fetchall()
@@ -0,0 +1,135 @@
+"""Bounded live history and hand-off queue for the ESP-NOW gateway."""
+import threading
+from collections import deque
+
+import numpy as np
+
+# ================= CONFIG =================
+HISTORY_SIZE = 8 * 3600   # readings kept in memory (8 h of one sensor at 1 Hz)
+QUEUE_SIZE = 256          # batches waiting for a consumer
+DROP_OLDEST = "drop-oldest"
+LATEST = "latest"
+
+
+# ================= RING STORE =================
+class RingStore:
+    """
+    Fixed-capacity history of readings in preallocated NumPy arrays.
+
+    Timestamps are epoch seconds (float64). Once full, new readings overwrite
+    the oldest ones, so memory stays flat however long the gateway runs.
+    """
+
+    def __init__(self, capacity=HISTORY_SIZE):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.sensor = np.zeros(capacity, dtype=np.int16)
+        self.meat = np.zeros(capacity, dtype=np.float32)
+        self.fire = np.zeros(capacity, dtype=np.float32)
+        self._next = 0      # slot the next reading goes into
+        self.total = 0      # readings ever appended
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def extend(self, ts, sensor, meat, fire):
+        """Append equal-length arrays of readings."""
+        n = len(ts)
+        with self._lock:
+            if n >= self.capacity:
+                # Only the newest `capacity` readings survive anyway
+                ts, sensor, meat, fire = (a[-self.capacity:] for a in (ts, sensor, meat, fire))
+                self.total += n - self.capacity
+                self._next = 0
+                n = self.capacity
+            first = min(n, self.capacity - self._next)
+            for dst, src in ((self.ts, ts), (self.sensor, sensor), (self.meat, meat), (self.fire, fire)):
+                dst[self._next:self._next + first] = src[:first]
+                dst[:n - first] = src[first:]
+            self._next = (self._next + n) % self.capacity
+            self.total += n
+
+    def oldest_ts(self):
+        with self._lock:
+            if not self.total:
+                return None
+            return float(self.ts[self._next if self.total >= self.capacity else 0])
+
+    def snapshot(self, since=None, sensor_id=None):
+        """Return (ts, sensor, meat, fire) copies in time order, optionally filtered."""
+        with self._lock:
+            if self.total >= self.capacity:
+                order = np.r_[self._next:self.capacity, 0:self._next]
+            else:
+                order = np.arange(self._next)
+            cols = [a[order] for a in (self.ts, self.sensor, self.meat, self.fire)]
+        mask = np.ones(len(cols[0]), dtype=bool)
+        if since is not None:
+            mask &= cols[0] >= since
+        if sensor_id is not None:
+            mask &= cols[1] == sensor_id
+        return tuple(c[mask] for c in cols)
+
+    def since(self, since, sensor_id, load_older=None):
+        """
+        Readings for one sensor from `since` onwards as [(ts, meat, fire), ...].
+
+        If `since` predates the ring and load_older(sensor_id, since, until) is
+        given, the missing part is fetched through it (normally from SQLite).
+        """
+        ts, _, meat, fire = self.snapshot(since, sensor_id)
+        rows = list(zip(ts.tolist(), meat.tolist(), fire.tolist()))
+        oldest = self.oldest_ts()
+        if load_older is not None and (oldest is None or since < oldest):
+            rows = load_older(sensor_id, since, oldest) + rows
+        return rows
+
+
+# ================= BOUNDED QUEUE =================
+class BoundedQueue:
+    """
+    Hand-off queue that never blocks the producer.
+
+    DROP_OLDEST keeps the newest `maxsize` items; LATEST keeps only the most
+    recent item, for consumers that just want the current state.
+    """
+
+    def __init__(self, maxsize=QUEUE_SIZE, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, LATEST):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.policy = policy
+        self.maxsize = 1 if policy == LATEST else maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Wait for and return the oldest item, or None on timeout."""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            return self._items.popleft() if self._items else None
+
+    def get_all(self):
+        """Take everything that is queued without waiting."""
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+    def qsize(self):
+        return len(self._items)
+
+    def empty(self):
+        return not self._items
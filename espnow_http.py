@@ -0,0 +1,182 @@
+"""Small HTTP server with live gateway data: a JSON snapshot and a Server-Sent Events stream."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from espnow_history import BoundedQueue
+
+# ================= CONFIG =================
+HTTP_HOST = "0.0.0.0"
+HTTP_PORT = 8080
+SNAPSHOT_MINUTES = 60     # default history returned by /api/snapshot
+CLIENT_QUEUE_SIZE = 64    # batches buffered per SSE client before the oldest are dropped
+KEEPALIVE_SEC = 15
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>ESP-NOW gateway</title>
+<style>body{font-family:sans-serif;margin:1em}canvas{width:100%;height:60vh;border:1px solid #ccc}</style>
+</head><body>
+<h3>ESP-NOW gateway <span id="status"></span></h3>
+<select id="sensor"></select>
+<canvas id="c"></canvas>
+<pre id="latest"></pre>
+<script>
+const data = {};   // sensor -> {ts:[], meat:[], fire:[]}
+const sel = document.getElementById("sensor"), cv = document.getElementById("c");
+function add(s, ts, meat, fire) {
+  if (!data[s]) { data[s] = {ts: [], meat: [], fire: []}; sel.add(new Option("Sensor " + s, s)); }
+  const d = data[s]; d.ts.push(...ts); d.meat.push(...meat); d.fire.push(...fire);
+  if (d.ts.length > 20000) for (const k in d) d[k].splice(0, d[k].length - 20000);
+}
+function draw() {
+  const d = data[sel.value]; const g = cv.getContext("2d");
+  cv.width = cv.clientWidth; cv.height = cv.clientHeight; g.clearRect(0, 0, cv.width, cv.height);
+  if (!d || !d.ts.length) return;
+  const t0 = d.ts[0], t1 = Math.max(d.ts[d.ts.length - 1], t0 + 60);
+  const all = d.meat.concat(d.fire), lo = Math.min(...all) - 5, hi = Math.max(...all) + 5;
+  for (const [k, color] of [["meat", "red"], ["fire", "orange"]]) {
+    g.strokeStyle = color; g.beginPath();
+    d.ts.forEach((t, i) => g.lineTo((t - t0) / (t1 - t0) * cv.width, (hi - d[k][i]) / (hi - lo) * cv.height));
+    g.stroke();
+  }
+  const i = d.ts.length - 1;
+  document.getElementById("latest").textContent =
+    new Date(d.ts[i] * 1000).toLocaleTimeString() + "  meat " + d.meat[i] + "\\u00b0F  fire " + d.fire[i] + "\\u00b0F";
+}
+fetch("api/snapshot").then(r => r.json()).then(j => {
+  for (const s in j.sensors) add(s, j.sensors[s].ts, j.sensors[s].meat, j.sensors[s].fire);
+  draw();
+  const es = new EventSource("api/stream");
+  es.addEventListener("reading", e => { const r = JSON.parse(e.data); add(r.sensor, r.ts, r.meat, r.fire); draw(); });
+  es.onopen = () => document.getElementById("status").textContent = "(live)";
+  es.onerror = () => document.getElementById("status").textContent = "(reconnecting)";
+});
+sel.onchange = draw;
+</script></body></html>
+"""
+
+
+# ================= HELPERS =================
+def batch_events(ts, sensor, meat, fire):
+    """Split one decoded batch into per-sensor JSON-ready dicts."""
+    events = []
+    for sensor_id in np.unique(sensor).tolist():
+        mask = sensor == sensor_id
+        events.append({
+            "sensor": sensor_id,
+            "ts": ts[mask].tolist(),
+            "meat": meat[mask].tolist(),
+            "fire": fire[mask].tolist(),
+        })
+    return events
+
+
+# ================= SERVER =================
+class LiveServer(ThreadingHTTPServer):
+    """
+    Serves /api/snapshot (JSON history from the RingStore), /api/stream (SSE)
+    and a minimal chart page at /.
+
+    publish() fans decoded batches out to every connected stream; each client
+    has its own bounded queue so a slow browser never holds up the gateway.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, history, stats=None, load_older=None, host=HTTP_HOST, port=HTTP_PORT):
+        super().__init__((host, port), LiveRequestHandler)
+        self.history = history
+        self.stats = stats or (lambda: {})
+        self.load_older = load_older
+        self._clients = set()
+        self._clients_lock = threading.Lock()
+
+    def publish(self, ts, sensor, meat, fire):
+        events = batch_events(ts, sensor, meat, fire)
+        with self._clients_lock:
+            for client in self._clients:
+                for event in events:
+                    client.put(event)
+
+    def client_count(self):
+        return len(self._clients)
+
+    def snapshot(self, sensor_id=None, minutes=SNAPSHOT_MINUTES):
+        since = time.time() - minutes * 60
+        sensors = {}
+        if sensor_id is not None and self.load_older is not None:
+            # A single sensor may reach back past what is held in memory
+            rows = self.history.since(since, sensor_id, self.load_older)
+            sensors[sensor_id] = {
+                "ts": [r[0] for r in rows], "meat": [r[1] for r in rows], "fire": [r[2] for r in rows],
+            }
+        else:
+            for event in batch_events(*self.history.snapshot(since, sensor_id)):
+                sensors[event.pop("sensor")] = event
+        return {"now": time.time(), "sensors": sensors, "stats": self.stats()}
+
+    def _subscribe(self):
+        client = BoundedQueue(CLIENT_QUEUE_SIZE)
+        with self._clients_lock:
+            self._clients.add(client)
+        return client
+
+    def _unsubscribe(self, client):
+        with self._clients_lock:
+            self._clients.discard(client)
+
+
+class LiveRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in ("/", "/index.html"):
+            self._send(200, "text/html; charset=utf-8", PAGE.encode())
+        elif url.path == "/api/snapshot":
+            query = parse_qs(url.query)
+            try:
+                sensor_id = int(query["sensor"][0]) if "sensor" in query else None
+                minutes = float(query.get("minutes", [SNAPSHOT_MINUTES])[0])
+            except ValueError:
+                self._send(400, "text/plain", b"sensor and minutes must be numbers")
+                return
+            body = json.dumps(self.server.snapshot(sensor_id, minutes)).encode()
+            self._send(200, "application/json", body)
+        elif url.path == "/api/stream":
+            self._stream()
+        else:
+            self._send(404, "text/plain", b"not found")
+
+    def _send(self, code, content_type, body):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        client = self.server._subscribe()
+        try:
+            while True:
+                event = client.get(timeout=KEEPALIVE_SEC)
+                if event is None:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    self.wfile.write(b"event: reading\ndata: " + json.dumps(event).encode() + b"\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server._unsubscribe(client)
+
+    def log_message(self, format, *args):
+        pass
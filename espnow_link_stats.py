@@ -0,0 +1,240 @@
+"""Per-sensor link-quality tracking for the ESP-NOW gateway."""
+import time
+from collections import deque
+
+# ================= CONFIG =================
+SEQ_MODULO = 256          # packet ids are uint8 and wrap 255 -> 0
+MAX_GAP = 128             # a larger jump is treated as a sensor restart, not as losses
+LOSS_TOLERANCE = 1.25     # a smaller gap is only loss if the time since the last packet could hold it,
+LOSS_JITTER_SEC = 0.5     # at the mean interval, with this much slack for rate drift and arrival jitter
+WINDOWS = (("1m", 60), ("15m", 15 * 60))
+BUCKET_SEC = 5            # resolution of the sliding windows
+DEDUP_WINDOW = 64         # packet ids remembered per sensor for duplicate detection
+DEDUP_RESTART_SEC = 0.5   # a seen id this long after the sensor's last packet (or half its
+                          # mean interval, if longer) is a restarted sensor, not a retransmit
+JITTER_GAIN = 1 / 16      # RFC 3550 style smoothing
+INTERVAL_GAIN = 1 / 16
+
+LINK_STATS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS link_stats (
+    sensor_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    received INTEGER,
+    missing INTEGER,
+    restarts INTEGER,
+    loss_1m REAL,
+    loss_15m REAL,
+    loss_session REAL,
+    mean_interval_s REAL,
+    jitter_s REAL,
+    since_last_s REAL,
+    PRIMARY KEY (sensor_id, ts)
+) WITHOUT ROWID
+"""
+INSERT_LINK_STATS = ("INSERT OR REPLACE INTO link_stats (sensor_id, ts, received, missing, restarts, loss_1m, "
+                     "loss_15m, loss_session, mean_interval_s, jitter_s, since_last_s) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def seq_gap(last_id, packet_id):
+    """Packets missing between two ids, counting across the 255 -> 0 wrap."""
+    return (packet_id - last_id - 1) % SEQ_MODULO
+
+
+def gap_is_loss(gap, elapsed, mean_interval):
+    """Whether `gap` missing packets fit in `elapsed` seconds; if not, the sensor restarted its ids."""
+    if gap > MAX_GAP:
+        return False
+    if not gap or not mean_interval:
+        return True
+    return gap + 1 <= (elapsed + LOSS_JITTER_SEC) * LOSS_TOLERANCE / mean_interval
+
+
+def loss_rate(received, missing):
+    total = received + missing
+    return missing / total if total else 0.0
+
+
+# ================= DUPLICATES =================
+class DuplicateFilter:
+    """
+    Drops retransmitted (sensor_id, packet_id) pairs in O(1).
+
+    Per sensor it keeps the newest id seen and a DEDUP_WINDOW-bit bitmap;
+    bit k is set when id (newest - k) mod 256 has been seen. A retransmit
+    follows the original within moments, so after a pause of more than
+    DEDUP_RESTART_SEC (or half the sensor's mean interval) a seen id means
+    the sensor rebooted and counts from 0 again; its state starts over.
+
+    This filter is the only deduplication. The state lives in memory, and the
+    database key includes the arrival-derived second, so a retransmit that
+    arrives after a gateway restart, or in a different second, is stored twice.
+    """
+
+    def __init__(self, window=DEDUP_WINDOW):
+        self.window = window
+        self._mask = (1 << window) - 1
+        self._state = {}          # sensor_id -> [newest_id, bitmap, last_seen, mean_interval]
+        self.duplicates = {}      # sensor_id -> count
+
+    def seen(self, sensor_id, packet_id, now=None):
+        """Record the packet; return True if it is a duplicate."""
+        now = time.monotonic() if now is None else now
+        state = self._state.get(sensor_id)
+        if state is None:
+            self._state[sensor_id] = [packet_id, 1, now, None]
+            return False
+
+        newest, bitmap, last_seen, mean_interval = state
+        interval = now - last_seen
+        if mean_interval is not None and interval > max(DEDUP_RESTART_SEC, mean_interval / 2):
+            state[:2] = packet_id, 1
+        else:
+            ahead = (packet_id - newest) % SEQ_MODULO
+            behind = (newest - packet_id) % SEQ_MODULO
+            if 0 < ahead <= MAX_GAP:
+                state[0] = packet_id
+                state[1] = ((bitmap << ahead) | 1) & self._mask
+            elif behind >= self.window:
+                # Too old to tell, or the sensor restarted: start over from this id
+                state[:2] = packet_id, 1
+            elif bitmap & (1 << behind):
+                self.duplicates[sensor_id] = self.duplicates.get(sensor_id, 0) + 1
+                return True
+            else:
+                state[1] = bitmap | (1 << behind)   # late, but not seen before
+
+        # Only packets that get through shape the interval; retransmits would shrink it
+        state[2] = now
+        state[3] = interval if mean_interval is None else mean_interval + (interval - mean_interval) * INTERVAL_GAIN
+        return False
+
+
+# ================= SLIDING WINDOW =================
+class WindowCounter:
+    """Received/missing totals over the last `window` seconds in BUCKET_SEC buckets."""
+
+    def __init__(self, window, bucket=BUCKET_SEC):
+        self.window = window
+        self.bucket = bucket
+        self._buckets = deque()   # [bucket_start, received, missing]
+        self.received = 0
+        self.missing = 0
+
+    def _expire(self, now):
+        horizon = now - self.window
+        while self._buckets and self._buckets[0][0] + self.bucket <= horizon:
+            _, r, m = self._buckets.popleft()
+            self.received -= r
+            self.missing -= m
+
+    def add(self, now, received, missing):
+        self._expire(now)
+        start = now - now % self.bucket
+        if not self._buckets or self._buckets[-1][0] != start:
+            self._buckets.append([start, 0, 0])
+        self._buckets[-1][1] += received
+        self._buckets[-1][2] += missing
+        self.received += received
+        self.missing += missing
+
+    def loss(self, now):
+        self._expire(now)
+        return loss_rate(self.received, self.missing)
+
+
+# ================= TRACKER =================
+class SensorLink:
+    def __init__(self, now):
+        self.first_seen = now
+        self.last_seen = now
+        self.last_id = None
+        self.received = 0
+        self.missing = 0
+        self.restarts = 0
+        self.mean_interval = None
+        self.jitter = 0.0
+        self.windows = {name: WindowCounter(sec) for name, sec in WINDOWS}
+
+
+class LinkTracker:
+    """
+    Tracks every sensor's link with O(1) work per packet.
+
+    update() returns how many packets were lost before this one. A jump in
+    ids is only loss if the time since the last packet is long enough for
+    that many packets (gap_is_loss); otherwise, e.g. after a reboot from a
+    high id back to 0, it counts as a restart. Loss rates are kept over
+    sliding windows and the whole session; jitter is the smoothed deviation
+    of per-packet inter-arrival times from their running mean.
+    """
+
+    def __init__(self):
+        self.sensors = {}
+
+    def update(self, sensor_id, packet_id, now=None):
+        now = time.monotonic() if now is None else now
+        link = self.sensors.get(sensor_id)
+        if link is None:
+            link = self.sensors[sensor_id] = SensorLink(now)
+
+        gap = 0
+        if link.last_id is not None:
+            gap = seq_gap(link.last_id, packet_id)
+            elapsed = now - link.last_seen
+            if not gap_is_loss(gap, elapsed, link.mean_interval):
+                # Behind the last id, or further ahead than the pause allows: the
+                # sensor rebooted (or the packet is stale). The pause is no interval.
+                link.restarts += 1
+                gap = 0
+            else:
+                # Spread over the lost packets too, so losses do not inflate the mean
+                interval = elapsed / (gap + 1)
+                if link.mean_interval is None:
+                    link.mean_interval = interval
+                else:
+                    link.jitter += (abs(interval - link.mean_interval) - link.jitter) * JITTER_GAIN
+                    link.mean_interval += (interval - link.mean_interval) * INTERVAL_GAIN
+
+        link.last_id = packet_id
+        link.last_seen = now
+        link.received += 1
+        link.missing += gap
+        for window in link.windows.values():
+            window.add(now, 1, gap)
+        return gap
+
+    def snapshot(self, now=None):
+        """One dict per sensor, suitable for printing, JSON or link_stats rows."""
+        now = time.monotonic() if now is None else now
+        out = []
+        for sensor_id, link in sorted(self.sensors.items()):
+            row = {
+                "sensor_id": sensor_id,
+                "received": link.received,
+                "missing": link.missing,
+                "restarts": link.restarts,
+                "loss_session": loss_rate(link.received, link.missing),
+                "mean_interval_s": link.mean_interval,
+                "jitter_s": link.jitter,
+                "since_last_s": now - link.last_seen,
+            }
+            for name, window in link.windows.items():
+                row[f"loss_{name}"] = window.loss(now)
+            out.append(row)
+        return out
+
+    def rows(self, ts=None):
+        """link_stats rows for INSERT_LINK_STATS, stamped with epoch seconds."""
+        ts = int(time.time()) if ts is None else ts
+        return [(r["sensor_id"], ts, r["received"], r["missing"], r["restarts"], r["loss_1m"], r["loss_15m"],
+                 r["loss_session"], r["mean_interval_s"], r["jitter_s"], r["since_last_s"])
+                for r in self.snapshot()]
+
+    def print_summary(self):
+        for r in self.snapshot():
+            interval = f"{r['mean_interval_s']:.1f}s" if r["mean_interval_s"] is not None else "-"
+            print(f"  Sensor {r['sensor_id']:3d}: rx {r['received']}, lost {r['missing']}, "
+                  f"loss 1m {r['loss_1m']*100:.1f}% / 15m {r['loss_15m']*100:.1f}% / all {r['loss_session']*100:.1f}%, "
+                  f"interval {interval} ± {r['jitter_s']:.2f}s, last {r['since_last_s']:.0f}s ago"
+                  + (f", restarts {r['restarts']}" if r["restarts"] else ""))
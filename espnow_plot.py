@@ -0,0 +1,168 @@
+"""Live meat/fire plot for the gateway readers that stays cheap on long cooks."""
+import time
+from datetime import datetime
+
+import matplotlib.dates as mdates
+import numpy as np
+
+# ================= CONFIG =================
+MAX_BUCKETS = 500     # min/max buckets kept per series (2 points each on screen)
+X_HEADROOM = 0.10     # extend the time axis by this fraction of the span when it runs out
+Y_MARGIN = 5.0        # degrees of padding when a value leaves the y range
+
+_EPOCH_DATENUM = mdates.date2num(datetime(1970, 1, 1))
+
+
+def epoch_to_datenum(ts):
+    """Epoch seconds -> matplotlib date numbers on the local clock, like date2num(datetime.now())."""
+    ts = np.asarray(ts, dtype=np.float64)
+    offset = time.localtime(ts[0]).tm_gmtoff if len(ts) else 0
+    return _EPOCH_DATENUM + (ts + offset) / 86400.0
+
+
+# ================= DECIMATION =================
+class MinMaxDecimator:
+    """
+    Min/max bucketing of an ever-growing series with a fixed number of buckets.
+
+    Each bucket covers `width` samples and remembers its lowest and highest
+    point. When the buckets run out, neighbours are merged and the width
+    doubles, so appends are amortized O(1) and the output never exceeds
+    2*max_buckets points however long the series gets.
+    """
+
+    def __init__(self, max_buckets=MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self.width = 1
+        self.count = 0
+        self._buckets = []   # [t_lo, v_lo, t_hi, v_hi, n]
+
+    def append(self, t, v):
+        self.count += 1
+        if self._buckets and self._buckets[-1][4] < self.width:
+            b = self._buckets[-1]
+            if v < b[1]:
+                b[0], b[1] = t, v
+            if v > b[3]:
+                b[2], b[3] = t, v
+            b[4] += 1
+            return
+        self._buckets.append([t, v, t, v, 1])
+        if len(self._buckets) > self.max_buckets:
+            self._merge()
+
+    def _merge(self):
+        merged = []
+        for i in range(0, len(self._buckets) - 1, 2):
+            a, b = self._buckets[i], self._buckets[i + 1]
+            lo = a if a[1] <= b[1] else b
+            hi = a if a[3] >= b[3] else b
+            merged.append([lo[0], lo[1], hi[2], hi[3], a[4] + b[4]])
+        if len(self._buckets) % 2:
+            merged.append(self._buckets[-1])
+        self._buckets = merged
+        self.width *= 2
+
+    def xy(self):
+        """Return (xs, ys) in time order, two points per bucket."""
+        xs, ys = [], []
+        for t_lo, v_lo, t_hi, v_hi, _ in self._buckets:
+            if t_lo == t_hi:
+                xs.append(t_lo); ys.append(v_lo)
+            elif t_lo < t_hi:
+                xs += (t_lo, t_hi); ys += (v_lo, v_hi)
+            else:
+                xs += (t_hi, t_lo); ys += (v_hi, v_lo)
+        return xs, ys
+
+    def y_range(self):
+        if not self._buckets:
+            return None
+        return min(b[1] for b in self._buckets), max(b[3] for b in self._buckets)
+
+
+# ================= LIVE PLOT =================
+class LivePlot:
+    """
+    Two persistent Line2D objects (meat on ax_meat, fire on ax_fire) redrawn by blitting.
+
+    Only the lines are redrawn each refresh. Axes limits grow in steps, and a
+    full redraw (which re-captures the background) happens only when a
+    limit has to change.
+    """
+
+    def __init__(self, fig, ax_meat, ax_fire, max_buckets=MAX_BUCKETS):
+        self.fig = fig
+        self.ax_meat = ax_meat
+        self.ax_fire = ax_fire
+        self.meat = MinMaxDecimator(max_buckets)
+        self.fire = MinMaxDecimator(max_buckets)
+        self.meat_line, = ax_meat.plot([], [], color="red", label="Meat Temp (°F)", animated=True)
+        self.fire_line, = ax_fire.plot([], [], color="orange", label="Fire Temp (°F)", animated=True)
+        self.full_redraws = 0
+        self._background = None
+        self._dirty = False
+        fig.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def legend(self, ax, *args, **kwargs):
+        """ax.legend() whose line samples are drawn normally (they copy animated=True)."""
+        leg = ax.legend(*args, **kwargs)
+        handles = getattr(leg, "legend_handles", None) or getattr(leg, "legendHandles", [])
+        for handle in handles:
+            handle.set_animated(False)
+        return leg
+
+    def extend(self, times, meats, fires):
+        """Add samples; times are matplotlib date numbers."""
+        for t, m, f in zip(times, meats, fires):
+            self.meat.append(t, m)
+            self.fire.append(t, f)
+        self._dirty = True
+
+    def refresh(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        self.meat_line.set_data(*self.meat.xy())
+        self.fire_line.set_data(*self.fire.xy())
+
+        if self._update_limits() or self._background is None:
+            self.full_redraws += 1
+            self.fig.canvas.draw_idle()
+            return
+
+        canvas = self.fig.canvas
+        canvas.restore_region(self._background)
+        self._draw_lines()
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def _on_draw(self, event):
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        self.ax_meat.draw_artist(self.meat_line)
+        self.ax_fire.draw_artist(self.fire_line)
+
+    def _update_limits(self):
+        """Grow the axes limits to fit the data; return True if anything changed."""
+        xs = self.meat_line.get_xdata()
+        if not len(xs):
+            return False
+        changed = False
+
+        x0, x1 = xs[0], xs[-1]
+        lo, hi = self.ax_meat.get_xlim()
+        if self.full_redraws == 0 or x1 > hi or x0 < lo:
+            span = max(x1 - x0, 1 / 1440)   # at least a minute (date numbers are days)
+            self.ax_meat.set_xlim(x0, x1 + span * X_HEADROOM)
+            changed = True
+
+        for ax, series in ((self.ax_meat, self.meat), (self.ax_fire, self.fire)):
+            y_min, y_max = series.y_range()
+            lo, hi = ax.get_ylim()
+            if self.full_redraws == 0 or y_min < lo or y_max > hi:
+                ax.set_ylim(y_min - Y_MARGIN, y_max + Y_MARGIN)
+                changed = True
+        return changed
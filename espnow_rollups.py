@@ -0,0 +1,195 @@
+"""Rollups and retention for the ESP-NOW gateway database.
+
+readings_1m and readings_15m hold per-sensor min/max/sum/count of meat and
+fire (in the same half-degree integers as `readings`), built incrementally
+behind a watermark. Raw readings, heartbeat runs and link stats older than the
+retention horizon are pruned once they are rolled up, and the freed pages
+are returned with incremental vacuum.
+"""
+import time
+from datetime import datetime
+
+from espnow_storage import from_scaled, readings_between
+
+# ================= CONFIG =================
+ROLLUP_INTERVAL_SEC = 60        # how often the maintenance job runs
+ROLLUP_SETTLE_SEC = 5 * 60      # buckets are final this long after they end (backlogged packets)
+ROLLUP_MAX_SPAN_SEC = 6 * 3600  # most source time rolled up per run, so catch-up stays incremental
+RAW_RETENTION_DAYS = 30         # raw readings/heartbeats/link stats kept; 0 = forever
+VACUUM_PAGES = 1000             # pages returned to the file system per run
+MAINT_SLOW_MS = 1000            # a run this slow is logged even if it only rolled up
+
+LEVELS = (
+    # table, bucket seconds, source table, source time column
+    ("readings_1m", 60, "readings", "ts"),
+    ("readings_15m", 15 * 60, "readings_1m", "bucket_ts"),
+)
+
+ROLLUP_SCHEMA = [f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    sensor_id INTEGER NOT NULL,
+    bucket_ts INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    meat_min INTEGER, meat_max INTEGER, meat_sum INTEGER,
+    fire_min INTEGER, fire_max INTEGER, fire_sum INTEGER,
+    PRIMARY KEY (sensor_id, bucket_ts)
+) WITHOUT ROWID
+""" for table, _, _, _ in LEVELS] + ["""
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name TEXT PRIMARY KEY,
+    done_until INTEGER NOT NULL
+)
+"""]
+
+# Aggregates per level: raw readings are single values, rollups are merged
+ROLLUP_SELECT = {
+    "readings": "COUNT(*), MIN(meat), MAX(meat), SUM(meat), MIN(fire), MAX(fire), SUM(fire)",
+    "readings_1m": "SUM(n), MIN(meat_min), MAX(meat_max), SUM(meat_sum), "
+                   "MIN(fire_min), MAX(fire_max), SUM(fire_sum)",
+}
+
+
+# ================= HELPERS =================
+def sensor_ids(conn, table):
+    """Distinct sensor ids of a table keyed on sensor_id, one index seek each."""
+    ids = []
+    row = conn.execute(f"SELECT MIN(sensor_id) FROM {table}").fetchone()
+    while row[0] is not None:
+        ids.append(row[0])
+        row = conn.execute(f"SELECT MIN(sensor_id) FROM {table} WHERE sensor_id > ?", (row[0],)).fetchone()
+    return ids
+
+
+def table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def watermark(conn, name):
+    row = conn.execute("SELECT done_until FROM rollup_state WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def rollup_between(conn, sensor_id, since, until=None, table="readings_1m"):
+    """Return [(bucket_ts, meat_avg, fire_avg), ...] for one sensor with since <= bucket_ts < until."""
+    if until is None:
+        until = 2**62
+    rows = conn.execute(
+        f"SELECT bucket_ts, meat_sum * 1.0 / n, fire_sum * 1.0 / n FROM {table} "
+        "WHERE sensor_id = ? AND bucket_ts >= ? AND bucket_ts < ? ORDER BY bucket_ts",
+        (sensor_id, since, until),
+    ).fetchall()
+    return [(ts, from_scaled(meat), from_scaled(fire)) for ts, meat, fire in rows]
+
+
+def readings_for_span(conn, sensor_id, since, until=None):
+    """
+    Like readings_between(), but long spans come from the rollups: raw rows
+    up to 6 hours, 1-minute averages up to 3 days, 15-minute beyond that.
+    Spans whose raw rows were pruned also fall back to the rollups.
+    """
+    span = (time.time() if until is None else until) - since
+    if span <= 6 * 3600:
+        rows = readings_between(conn, sensor_id, since, until)
+        if rows:
+            return rows
+    table = "readings_1m" if span <= 3 * 86400 else "readings_15m"
+    return rollup_between(conn, sensor_id, since, until, table)
+
+
+# ================= MAINTENANCE =================
+class Maintenance:
+    """
+    Periodic job for DBWriter(periodic=[(ROLLUP_INTERVAL_SEC, Maintenance())]).
+
+    Each call rolls up complete buckets past each level's watermark, prunes
+    rows older than keep_days that are already rolled up, and vacuums
+    incrementally. It runs on the writer's connection, so it never competes
+    with inserts for the write lock. The counts are returned for the writer's
+    stats line; a run is only logged if it pruned or freed something, or was slow.
+    """
+
+    __name__ = "maintenance"
+
+    def __init__(self, keep_days=RAW_RETENTION_DAYS, settle=ROLLUP_SETTLE_SEC,
+                 max_span=ROLLUP_MAX_SPAN_SEC, vacuum_pages=VACUUM_PAGES):
+        self.keep_days = keep_days
+        self.settle = settle
+        self.max_span = max_span
+        self.vacuum_pages = vacuum_pages
+        self.runs = 0
+        self.last_ms = 0.0
+
+    def __call__(self, conn, now=None):
+        now = time.time() if now is None else now
+        t0 = time.perf_counter()
+        with conn:
+            rolled = [self._rollup(conn, now, *level) for level in LEVELS]
+            pruned = self._prune(conn, now) if self.keep_days else {}
+        freed = self._vacuum(conn)
+        self.runs += 1
+        self.last_ms = (time.perf_counter() - t0) * 1000
+        if any(pruned.values()) or freed or self.last_ms > MAINT_SLOW_MS:
+            parts = [f"rolled up {rolled[0]} 1m / {rolled[1]} 15m buckets"]
+            parts += [f"pruned {n} {name}" for name, n in pruned.items()]
+            parts.append(f"freed {freed} pages")
+            print(f"[DB MAINT] {', '.join(parts)} in {self.last_ms:.0f} ms")
+        return {"buckets_rolled": sum(rolled), "rows_pruned": sum(pruned.values()), "pages_freed": freed}
+
+    def _rollup(self, conn, now, table, bucket, source, time_col):
+        """Aggregate source rows into `table` up to the newest settled bucket."""
+        sensors = sensor_ids(conn, source)
+        if not sensors:
+            return 0
+        start = watermark(conn, table)
+        if start is None:
+            first = min(conn.execute(f"SELECT MIN({time_col}) FROM {source} WHERE sensor_id = ?", (s,)).fetchone()[0]
+                        for s in sensors)
+            start = first - first % bucket
+
+        end = now - self.settle
+        if source != "readings":
+            # Only complete 1-minute buckets may feed a coarser level
+            end = min(end, watermark(conn, source) or 0)
+        end = min(end, start + self.max_span)
+        end -= end % bucket
+        if end <= start:
+            return 0
+
+        sql = (f"INSERT OR REPLACE INTO {table} (sensor_id, bucket_ts, n, meat_min, meat_max, meat_sum, "
+               f"fire_min, fire_max, fire_sum) "
+               f"SELECT sensor_id, {time_col} - {time_col} % {bucket}, {ROLLUP_SELECT[source]} FROM {source} "
+               f"WHERE sensor_id = ? AND {time_col} >= ? AND {time_col} < ? "
+               f"GROUP BY {time_col} - {time_col} % {bucket}")
+        rows = sum(conn.execute(sql, (s, start, end)).rowcount for s in sensors)
+        conn.execute("INSERT OR REPLACE INTO rollup_state (name, done_until) VALUES (?, ?)", (table, end))
+        return rows
+
+    def _prune(self, conn, now):
+        cutoff = int(now - self.keep_days * 86400)
+        # Never drop raw rows the 1-minute rollup has not seen yet
+        raw_cutoff = min(cutoff, watermark(conn, "readings_1m") or 0)
+        pruned = {"readings": 0, "link_stats": 0, "heartbeats": 0, "heartbeat runs": 0}
+        for s in sensor_ids(conn, "readings"):
+            pruned["readings"] += conn.execute(
+                "DELETE FROM readings WHERE sensor_id = ? AND ts < ?", (s, raw_cutoff)).rowcount
+        for s in sensor_ids(conn, "link_stats"):
+            pruned["link_stats"] += conn.execute(
+                "DELETE FROM link_stats WHERE sensor_id = ? AND ts < ?", (s, cutoff)).rowcount
+        pruned["heartbeat runs"] = conn.execute(
+            "DELETE FROM heartbeat_log WHERE last_seen < ?", (cutoff,)).rowcount
+        if table_exists(conn, "heartbeat"):
+            # Rows from before heartbeat_log; timestamps are local ISO strings, which sort like times
+            pruned["heartbeats"] = conn.execute(
+                "DELETE FROM heartbeat WHERE timestamp < ?", (datetime.fromtimestamp(cutoff).isoformat(),)).rowcount
+        return pruned
+
+    def _vacuum(self, conn):
+        """Give back up to vacuum_pages free pages; returns how many were freed."""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return 0
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not before:
+            return 0
+        # execute() would only step the pragma once, i.e. free a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+        return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
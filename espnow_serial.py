@@ -0,0 +1,133 @@
+"""Event-driven serial input for the ESP-NOW gateway."""
+import asyncio
+import os
+import random
+import time
+
+import serial
+
+# ================= CONFIG =================
+READ_SIZE = 4096          # max bytes taken per wake-up
+OPEN_SETTLE_SEC = 2       # the ESP32 gateway resets when the port is opened
+MIN_BACKOFF_SEC = 0.5
+MAX_BACKOFF_SEC = 30
+
+
+# ================= SERIAL STREAM =================
+class SerialStream:
+    """
+    Reads a serial port from an asyncio loop and passes raw chunks to on_data(chunk).
+
+    The port's file descriptor is registered with loop.add_reader(), so the
+    loop only wakes when bytes arrive. If the device goes away (EOF or an
+    OSError), the port is closed and reopened with jittered exponential
+    backoff. Everything delivered before that point has already been handed
+    to on_data, so nothing buffered downstream is lost.
+    """
+
+    def __init__(self, port, baud, on_data, on_reconnect=None, settle=OPEN_SETTLE_SEC,
+                 min_backoff=MIN_BACKOFF_SEC, max_backoff=MAX_BACKOFF_SEC):
+        self.port = port
+        self.baud = baud
+        self.on_data = on_data
+        self.on_reconnect = on_reconnect
+        self.settle = settle
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connected = False
+        self._stopped = False
+        self._loop = None
+        self._lost = None
+        self._ser = None
+
+        # Stats
+        self.bytes_read = 0
+        self.wakeups = 0
+        self.reconnects = 0
+        self.callback_errors = 0
+        self.last_data_time = None
+
+    def stop(self):
+        """Ask run() to return; safe to call from any thread."""
+        self._stopped = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._interrupt)
+
+    def in_waiting(self):
+        """Bytes the OS has received but the loop has not read yet."""
+        ser = self._ser
+        try:
+            return ser.in_waiting if ser is not None and self.connected else 0
+        except (serial.SerialException, OSError):
+            return 0
+
+    def _interrupt(self):
+        if self._lost is not None and not self._lost.done():
+            self._lost.set_result(None)
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        backoff = self.min_backoff
+        while not self._stopped:
+            try:
+                ser = serial.Serial(self.port, self.baud, timeout=0)
+            except (serial.SerialException, OSError) as e:
+                delay = backoff * random.uniform(0.8, 1.2)
+                print(f"[SERIAL] Could not open {self.port}: {e} (retrying in {delay:.1f}s)")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            backoff = self.min_backoff
+            print(f"Listening on {self.port} at {self.baud} baud...")
+            self._ser = ser
+            try:
+                await asyncio.sleep(self.settle)
+                self.connected = True
+                error = await self._pump(ser)
+            finally:
+                self.connected = False
+                self._ser = None
+                ser.close()
+
+            if self._stopped:
+                break
+            self.reconnects += 1
+            print(f"[SERIAL] Lost {self.port}: {error or 'end of file'}; reconnecting")
+            if self.on_reconnect:
+                self.on_reconnect()
+
+    async def _pump(self, ser):
+        """Deliver chunks until the port fails; returns the error (None for EOF)."""
+        loop = asyncio.get_running_loop()
+        fd = ser.fileno()
+        lost = self._lost = loop.create_future()
+
+        def readable():
+            try:
+                chunk = os.read(fd, READ_SIZE)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                if not lost.done():
+                    lost.set_result(e)
+                return
+            if not chunk:
+                if not lost.done():
+                    lost.set_result(None)
+                return
+
+            self.wakeups += 1
+            self.bytes_read += len(chunk)
+            self.last_data_time = time.monotonic()
+            try:
+                self.on_data(chunk)
+            except Exception as e:
+                self.callback_errors += 1
+                print(f"[ERROR] Serial data handler exception: {e}")
+
+        loop.add_reader(fd, readable)
+        try:
+            return await lost
+        finally:
+            loop.remove_reader(fd)
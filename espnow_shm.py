@@ -0,0 +1,141 @@
+"""Shared-memory ring of decoded readings, published by the gateway for UI/export processes.
+
+One process writes; any number of processes attach by name and read at
+their own pace without ever blocking the writer. Every record carries its
+sequence number, so a reader can tell a slot that was overwritten before it
+got there (counted as lost) from one that is not fully published yet.
+"""
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# ================= CONFIG =================
+RING_NAME = "espnow_gateway"
+RING_CAPACITY = 1 << 16   # readings; ~2 MB
+RING_MAGIC = 0x45534E4F57524E47
+
+HEADER = np.dtype([("magic", "<u8"), ("capacity", "<u8"), ("written", "<u8")])
+HEADER_SIZE = 64
+RECORD = np.dtype([
+    ("seq", "<u8"),          # 1-based position in the stream; 0 = never written
+    ("published", "<f8"),    # time.time() when the writer published it
+    ("ts", "<f8"),
+    ("sensor", "<i2"),
+    ("meat", "<f4"),
+    ("fire", "<f4"),
+])
+
+
+# ================= RING =================
+class SharedRing:
+    """A fixed-size ring of RECORDs in a named shared memory block."""
+
+    def __init__(self, shm, owner):
+        self._shm = shm
+        self.owner = owner
+        self._header = np.ndarray((1,), HEADER, buffer=shm.buf)
+        if int(self._header["magic"][0]) != RING_MAGIC:
+            raise ValueError(f"Shared memory {shm.name} is not an ESP-NOW readings ring")
+        self.capacity = int(self._header["capacity"][0])
+        self.records = np.ndarray((self.capacity,), RECORD, buffer=shm.buf, offset=HEADER_SIZE)
+
+    @classmethod
+    def create(cls, name=RING_NAME, capacity=RING_CAPACITY):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + capacity * RECORD.itemsize)
+        header = np.ndarray((1,), HEADER, buffer=shm.buf)
+        header["capacity"] = capacity
+        header["written"] = 0
+        header["magic"] = RING_MAGIC
+        np.ndarray((capacity,), RECORD, buffer=shm.buf, offset=HEADER_SIZE)["seq"] = 0
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name=RING_NAME):
+        shm = shared_memory.SharedMemory(name=name)
+        # Only the creator may unlink the block; otherwise the resource tracker
+        # would remove it when this (reading) process exits
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def written(self):
+        return int(self._header["written"][0])
+
+    def write(self, ts, sensor, meat, fire):
+        """Publish equal-length arrays of readings (single writer only)."""
+        n = len(ts)
+        start = self.written
+        if n > self.capacity:
+            ts, sensor, meat, fire = (a[-self.capacity:] for a in (ts, sensor, meat, fire))
+            start += n - self.capacity
+            n = self.capacity
+        pos = start + np.arange(n, dtype=np.uint64)
+        idx = pos % self.capacity
+        rec = self.records
+        rec["seq"][idx] = 0     # mark the slots as in progress
+        rec["published"][idx] = time.time()
+        rec["ts"][idx] = ts
+        rec["sensor"][idx] = sensor
+        rec["meat"][idx] = meat
+        rec["fire"][idx] = fire
+        rec["seq"][idx] = pos + 1
+        self._header["written"] = start + n
+
+    def close(self):
+        del self.records, self._header
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+
+# ================= READER =================
+class RingReader:
+    """
+    One consumer's cursor into a SharedRing.
+
+    read() returns everything published since the previous call. If the
+    writer laps the reader, the overwritten readings are skipped and counted
+    in `lost`; `behind` and `lag_ms` describe how far back the reader is.
+    """
+
+    def __init__(self, ring, from_start=False):
+        self.ring = ring
+        written = ring.written
+        self.cursor = max(0, written - ring.capacity) if from_start else written
+        self.lost = 0
+        self.behind = 0
+        self.lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    def read(self):
+        """Return (ts, sensor, meat, fire) arrays of the readings not seen yet."""
+        written = self.ring.written
+        oldest = written - self.ring.capacity
+        if self.cursor < oldest:
+            self.lost += oldest - self.cursor
+            self.cursor = oldest
+
+        pos = np.arange(self.cursor, written, dtype=np.uint64)
+        rec = self.ring.records[pos % self.ring.capacity]
+        expected = pos + 1
+        # A slot holding an older sequence is still being written: stop before it
+        pending = np.flatnonzero(rec["seq"] < expected)
+        if len(pending):
+            rec, expected = rec[:pending[0]], expected[:pending[0]]
+        # A newer sequence means the writer lapped us while we copied
+        fresh = rec["seq"] == expected
+        self.lost += int(len(rec) - fresh.sum())
+        self.cursor += len(rec)
+        rec = rec[fresh]
+
+        self.behind = self.ring.written - self.cursor
+        if len(rec):
+            self.lag_ms = (time.time() - float(rec["published"].min())) * 1000
+            self.max_lag_ms = max(self.max_lag_ms, self.lag_ms)
+        return rec["ts"], rec["sensor"], rec["meat"], rec["fire"]
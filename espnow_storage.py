@@ -0,0 +1,409 @@
+"""SQLite storage for the ESP-NOW gateway."""
+import multiprocessing
+import os
+import queue
+import signal
+import sqlite3
+import threading
+import time
+
+# ================= CONFIG =================
+QUEUE_SIZE = 10000        # pending insert requests before insert() starts dropping
+BATCH_MAX_ROWS = 500      # commit once this many rows are pending...
+BATCH_MAX_DELAY = 1.0     # ...or once the oldest pending row is this old (seconds)
+
+TEMP_SCALE = 2            # temperatures are stored as integer half degrees
+
+STATS_INTERVAL_SEC = 0.5  # how often a storage process publishes its stats
+CLOSE_TIMEOUT_SEC = 30    # how long close() waits for a storage process to flush before killing it
+
+_STOP = "stop"            # a plain value, so it survives a multiprocessing queue
+
+
+# ================= SCHEMA =================
+# One row per reading, clustered on (sensor_id, ts) so "last N minutes of
+# sensor X" is a range seek. ts is unix epoch seconds, rebuilt from the
+# arrival time, so packets of one sensor that arrive close together can
+# cover the same seconds; packet_id in the key keeps their readings apart.
+READINGS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    sensor_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    reading_index INTEGER NOT NULL,
+    packet_id INTEGER NOT NULL,
+    meat INTEGER,
+    fire INTEGER,
+    gateway_id INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (sensor_id, ts, packet_id, reading_index)
+) WITHOUT ROWID
+"""
+READING_COLUMNS = "sensor_id, ts, reading_index, packet_id, meat, fire, gateway_id"
+# ts comes from the arrival time (sensors send no clock), so the key does not
+# deduplicate retransmits: DuplicateFilter drops them in memory, and one that
+# gets past it (e.g. across a gateway restart) is stored again unless it lands
+# in the same second, where the writer rejects and counts it.
+INSERT_READING = f"INSERT INTO readings ({READING_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+
+def enable_incremental_vacuum(conn):
+    """Switch the file to auto_vacuum=INCREMENTAL so pruned pages can be given back in small steps."""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # An initialized file (even an empty one in WAL mode) only picks up
+        # the new mode after a full VACUUM
+        if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0]:
+            print("[DB] Enabling incremental vacuum (one-time VACUUM)...")
+        conn.execute("VACUUM")
+
+
+def add_column(table, column, decl):
+    """Schema step that adds `column` to a table created before the column existed."""
+    def step(conn):
+        if column not in [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    step.__name__ = f"add_{table}_{column}"
+    return step
+
+
+def upgrade_readings_key(conn):
+    """Rebuild a readings table whose key predates packet_id (and drop its old dedup index)."""
+    conn.execute("DROP INDEX IF EXISTS readings_packet_dedup")
+    key = [row[1] for row in conn.execute("PRAGMA table_info(readings)") if row[5]]
+    if "packet_id" in key:
+        return
+    print("[DB] Adding packet_id to the readings key (one-time table rebuild)...")
+    conn.execute("ALTER TABLE readings RENAME TO readings_old")
+    conn.execute(READINGS_SCHEMA)
+    conn.execute(f"INSERT INTO readings ({READING_COLUMNS}) SELECT {READING_COLUMNS} FROM readings_old")
+    conn.execute("DROP TABLE readings_old")
+
+
+def to_scaled(temp):
+    return int(round(temp * TEMP_SCALE))
+
+
+def from_scaled(value):
+    return None if value is None else value / TEMP_SCALE
+
+
+def readings_between(conn, sensor_id, since, until=None):
+    """Return [(ts, meat, fire), ...] for one sensor with since <= ts < until."""
+    if until is None:
+        until = 2**62
+    rows = conn.execute(
+        "SELECT ts, meat, fire FROM readings WHERE sensor_id = ? AND ts >= ? AND ts < ? ORDER BY ts, reading_index",
+        (sensor_id, since, until),
+    ).fetchall()
+    return [(ts, from_scaled(meat), from_scaled(fire)) for ts, meat, fire in rows]
+
+
+def recent_readings(conn, sensor_id, minutes, now=None):
+    """Return [(ts, meat, fire), ...] for one sensor over the last `minutes`."""
+    since = int((time.time() if now is None else now) - minutes * 60)
+    return readings_between(conn, sensor_id, since)
+
+
+# ================= WRITER THREAD =================
+class DBWriter(threading.Thread):
+    """
+    Owns the SQLite connection and writes rows in group commits.
+
+    `schema` holds SQL statements or callables taking the connection, run
+    once on connect; `periodic` jobs (e.g. rollups) share the connection. Producers call insert(sql, rows) from any thread; rows
+    for the same statement are combined into one executemany and every batch
+    is a single transaction. close() flushes whatever is still queued.
+    """
+
+    def __init__(self, db_name, schema=(), max_rows=BATCH_MAX_ROWS,
+                 max_delay=BATCH_MAX_DELAY, queue_size=QUEUE_SIZE, synchronous="NORMAL", source=None,
+                 periodic=()):
+        super().__init__(name="db-writer", daemon=True)
+        self.db_name = db_name
+        self.schema = list(schema)
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.synchronous = synchronous
+        # `source` lets another process feed the writer through a multiprocessing queue
+        self.queue = source if source is not None else queue.Queue(maxsize=queue_size)
+        # (interval_sec, fn(conn)) jobs run on the writer's connection between batches; a job
+        # may return counts such as {"rows_pruned": 12} to add to the stats below
+        self.periodic = [[interval, fn, time.monotonic() + interval] for interval, fn in periodic]
+
+        # Stats
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self._full = False
+        self.rows_rejected = 0    # rows that conflicted with one already stored
+        self.batches = 0
+        self.last_batch_ms = 0.0
+        self.max_batch_ms = 0.0
+        self.total_batch_ms = 0.0
+        self.errors = 0
+        self.lag_ms = 0.0         # insert() to commit, for the oldest row of the last batch
+        self.max_lag_ms = 0.0
+        self.buckets_rolled = 0   # maintenance totals, see espnow_rollups.Maintenance
+        self.rows_pruned = 0
+        self.pages_freed = 0
+
+    def insert(self, sql, rows):
+        """Queue rows for `sql` without blocking; returns False (and counts them dropped) if the queue is full."""
+        try:
+            self.queue.put_nowait((sql, rows, time.monotonic()))
+            self._full = False
+            return True
+        except queue.Full:
+            self.rows_dropped += len(rows)
+            if not self._full:
+                # Once per episode; every drop is counted in stats_line()
+                print("[DB WARN] Writer queue full, dropping rows")
+                self._full = True
+            return False
+
+    def close(self, timeout=None):
+        """Stop the thread after everything queued so far is committed."""
+        self.queue.put(_STOP)
+        self.join(timeout)
+
+    def stats_line(self):
+        avg = self.total_batch_ms / self.batches if self.batches else 0
+        return (f"{self.rows_written} rows in {self.batches} batches, "
+                f"last {self.last_batch_ms:.1f} ms, avg {avg:.1f} ms, max {self.max_batch_ms:.1f} ms, "
+                f"lag {self.lag_ms:.0f} ms (max {self.max_lag_ms:.0f}), "
+                f"queued {self.queue.qsize()}, dropped {self.rows_dropped}, rejected {self.rows_rejected}, "
+                f"rolled up {self.buckets_rolled} buckets, pruned {self.rows_pruned} rows, "
+                f"freed {self.pages_freed} pages")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        for stmt in self.schema:
+            # Callables handle steps that are more than one statement
+            if callable(stmt):
+                stmt(conn)
+            else:
+                conn.execute(stmt)
+        conn.commit()
+        return conn
+
+    def run(self):
+        conn = self._connect()
+        pending = {}      # sql -> list of rows
+        count = 0
+        deadline = None
+        oldest = None     # when the oldest pending rows were queued
+        stopping = False
+        try:
+            while not stopping:
+                wake = [job[2] for job in self.periodic]
+                if deadline is not None:
+                    wake.append(deadline)
+                timeout = max(0, min(wake) - time.monotonic()) if wake else None
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item == _STOP:
+                    stopping = True
+                elif item is not None:
+                    sql, rows, queued_at = item
+                    pending.setdefault(sql, []).extend(rows)
+                    count += len(rows)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.max_delay
+                        oldest = queued_at
+
+                if count and (stopping or count >= self.max_rows or time.monotonic() >= deadline):
+                    self._write(conn, pending, count)
+                    self.lag_ms = (time.monotonic() - oldest) * 1000
+                    self.max_lag_ms = max(self.max_lag_ms, self.lag_ms)
+                    pending = {}
+                    count = 0
+                    deadline = None
+
+                if not stopping:
+                    self._run_periodic(conn)
+        finally:
+            conn.close()
+
+    def _run_periodic(self, conn):
+        now = time.monotonic()
+        for job in self.periodic:
+            interval, fn, due = job
+            if now < due:
+                continue
+            job[2] = now + interval
+            try:
+                counts = fn(conn)
+            except sqlite3.Error as e:
+                self.errors += 1
+                print(f"[DB ERROR] Periodic job {getattr(fn, '__name__', fn)} failed: {e}")
+                continue
+            for name, n in (counts or {}).items():
+                setattr(self, name, getattr(self, name) + n)
+
+    def _write(self, conn, pending, count):
+        t0 = time.perf_counter()
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                written = sum(self._insert(conn, sql, rows) for sql, rows in pending.items())
+            self.rows_written += written
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"[DB ERROR] Batch of {count} rows failed: {e}")
+        ms = (time.perf_counter() - t0) * 1000
+        self.batches += 1
+        self.last_batch_ms = ms
+        self.max_batch_ms = max(self.max_batch_ms, ms)
+        self.total_batch_ms += ms
+
+    def _insert(self, conn, sql, rows):
+        """executemany; if a row violates a constraint, redo the rows one by one so only it is lost."""
+        conn.execute("SAVEPOINT rows")
+        try:
+            conn.executemany(sql, rows)
+            return len(rows)
+        except sqlite3.IntegrityError:
+            conn.execute("ROLLBACK TO rows")
+        finally:
+            conn.execute("RELEASE rows")
+        written = 0
+        for row in rows:
+            try:
+                conn.execute(sql, row)
+                written += 1
+            except sqlite3.IntegrityError as e:
+                if not self.rows_rejected:
+                    print(f"[DB WARN] Rejected row {row}: {e}")
+                self.rows_rejected += 1
+        print(f"[DB WARN] {len(rows) - written} of {len(rows)} rows rejected ({self.rows_rejected} so far)")
+        return written
+
+
+# ================= WRITER PROCESS =================
+STAT_FIELDS = ("rows_written", "rows_dropped", "rows_rejected", "batches", "last_batch_ms", "max_batch_ms",
+               "total_batch_ms", "errors", "lag_ms", "max_lag_ms", "buckets_rolled", "rows_pruned", "pages_freed")
+
+
+class StorageProcess:
+    """
+    Runs a DBWriter in a child process so commits and fsyncs never hold the
+    reader's GIL.
+
+    It has the same insert()/close()/stats_line() API as DBWriter. Rows travel
+    over a bounded multiprocessing queue, and the child copies the writer's
+    stats into shared memory about every STATS_INTERVAL_SEC. The "fork" start
+    method is used so the gateway script is not imported again in the child.
+    If the parent dies without close() (e.g. SIGKILL), the child notices on
+    its next stats update, commits what already reached it and exits. If the
+    child dies, its exit code is reported once and further rows count as
+    dropped.
+    """
+
+    def __init__(self, db_name, schema=(), queue_size=QUEUE_SIZE, **writer_args):
+        ctx = multiprocessing.get_context("fork")
+        self.db_name = db_name
+        self.queue = ctx.Queue(maxsize=queue_size)
+        self._shared = ctx.Array("d", len(STAT_FIELDS), lock=False)
+        self._dropped = 0
+        self._full = False
+        self._dead = False
+        self._parent_pid = os.getpid()
+        self._process = ctx.Process(target=self._run, args=(db_name, schema, writer_args),
+                                    name="espnow-storage", daemon=True)
+
+    def __getattr__(self, name):
+        # rows_written, batches, lag_ms, ... as last published by the child
+        if name in STAT_FIELDS:
+            value = self._shared[STAT_FIELDS.index(name)]
+            return value + self._dropped if name == "rows_dropped" else value
+        raise AttributeError(name)
+
+    def start(self):
+        self._process.start()
+
+    def insert(self, sql, rows):
+        """Queue rows for `sql` without blocking; returns False (and counts them dropped) if the queue is full."""
+        if not self._alive():
+            self._dropped += len(rows)
+            return False
+        try:
+            self.queue.put_nowait((sql, rows, time.monotonic()))
+            self._full = False
+            return True
+        except queue.Full:
+            self._dropped += len(rows)
+            if not self._full:
+                # Once per episode; every drop is counted in stats_line()
+                print("[DB WARN] Storage queue full, dropping rows")
+                self._full = True
+            return False
+
+    def qsize(self):
+        self._alive()
+        try:
+            return self.queue.qsize()
+        except NotImplementedError:   # macOS
+            return -1
+
+    def close(self, timeout=CLOSE_TIMEOUT_SEC):
+        """Stop the child after everything queued so far is committed, killing it after `timeout` seconds."""
+        if not self._alive():
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+            self._process.join(max(deadline - time.monotonic(), 0))
+        except queue.Full:
+            pass
+        if self._process.is_alive():
+            print(f"[DB ERROR] Storage process did not finish within {timeout} s, killing it; "
+                  f"{self.qsize()} queued inserts are lost")
+            # Rows still in the pipe would otherwise keep this process from exiting
+            self.queue.cancel_join_thread()
+            self._process.kill()
+            self._process.join()
+        self._dead = True
+        if self._process.exitcode:
+            print(f"[DB ERROR] Storage process exited with code {self._process.exitcode}")
+
+    def _alive(self):
+        """Whether the child is still running; reports its exit code the first time it is found dead."""
+        if self._dead:
+            return False
+        if self._process.is_alive():
+            return True
+        self._dead = True
+        print(f"[DB ERROR] Storage process exited with code {self._process.exitcode}, "
+              f"readings are no longer saved")
+        return False
+
+    def stats_line(self):
+        batches = self.batches
+        avg = self.total_batch_ms / batches if batches else 0
+        return (f"{self.rows_written:.0f} rows in {batches:.0f} batches, "
+                f"last {self.last_batch_ms:.1f} ms, avg {avg:.1f} ms, max {self.max_batch_ms:.1f} ms, "
+                f"lag {self.lag_ms:.0f} ms (max {self.max_lag_ms:.0f}), "
+                f"queued {self.qsize()}, dropped {self.rows_dropped:.0f}, rejected {self.rows_rejected:.0f}, "
+                f"rolled up {self.buckets_rolled:.0f} buckets, pruned {self.rows_pruned:.0f} rows, "
+                f"freed {self.pages_freed:.0f} pages")
+
+    def _run(self, db_name, schema, writer_args):
+        # The parent decides when to stop: Ctrl+C must not cut a batch short
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        writer = DBWriter(db_name, schema=schema, source=self.queue, **writer_args)
+        writer.start()
+        orphaned = False
+        while writer.is_alive():
+            writer.join(STATS_INTERVAL_SEC)
+            for i, name in enumerate(STAT_FIELDS):
+                self._shared[i] = getattr(writer, name)
+            if not orphaned and os.getppid() != self._parent_pid:
+                # Nobody will send _STOP any more; queue it behind the rows already sent
+                print("[DB] Gateway process is gone, flushing and exiting")
+                orphaned = True
+                self.queue.put(_STOP)
@@ -0,0 +1,103 @@
+"""UDP input for ESP-NOW sensor frames sent by Wi-Fi connected ESP32s."""
+import asyncio
+import socket
+
+# ================= CONFIG =================
+UDP_HOST = "0.0.0.0"
+UDP_PORT = 5005
+BATCH_DELAY_SEC = 0.02    # datagrams arriving within this window are handled together
+RCVBUF_BYTES = 1 << 20    # kernel buffer for bursts while a batch is being stored
+
+
+def split_datagram(data, start_magic, end_magic, is_packet=None):
+    """
+    Return (payloads, bytes_discarded) for one datagram.
+
+    A datagram either holds one or more START_MAGIC ... END_MAGIC frames, or
+    is a single bare payload. Payloads are memoryview slices of `data`.
+    A bare payload can itself start with the start magic (packet id 0x55,
+    sensor 0xAA), so the datagram only counts as framed if its frames fill
+    it exactly and `is_packet(payload)` accepts each of them; otherwise a
+    datagram that `is_packet` accepts whole is taken as bare.
+    """
+    view = memoryview(data)
+    if not data.startswith(start_magic):
+        return [view], 0
+    payloads = []
+    pos = 0
+    while pos < len(data):
+        end = data.find(end_magic, pos + len(start_magic)) if data.startswith(start_magic, pos) else -1
+        payload = view[pos + len(start_magic):end] if end != -1 else None
+        if payload is None or (is_packet and not is_packet(payload)):
+            if is_packet and is_packet(view):
+                return [view], 0
+            # Datagrams are never continued, so a broken frame cannot be resynced
+            return payloads, len(data) - pos
+        payloads.append(payload)
+        pos = end + len(end_magic)
+    return payloads, 0
+
+
+# ================= LISTENER =================
+class DatagramListener(asyncio.DatagramProtocol):
+    """
+    Collects datagrams and hands them to on_datagrams(list_of_bytes) in batches.
+
+    Per-datagram work (a DB insert, a ring write) would dominate under load;
+    batching every BATCH_DELAY_SEC keeps that cost per batch instead. See
+    bench_espnow_gateway.py --udp for what a given machine sustains.
+    """
+
+    def __init__(self, on_datagrams, batch_delay=BATCH_DELAY_SEC):
+        self.on_datagrams = on_datagrams
+        self.batch_delay = batch_delay
+        self._pending = []
+        self._flush_handle = None
+        self._loop = None
+
+        # Stats
+        self.datagrams = 0
+        self.bytes_read = 0
+        self.batches = 0
+        self.errors = 0
+        self.callback_errors = 0
+        self.senders = set()
+
+    def connection_made(self, transport):
+        self._loop = asyncio.get_running_loop()
+        sock = transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF_BYTES)
+
+    def datagram_received(self, data, addr):
+        self.datagrams += 1
+        self.bytes_read += len(data)
+        self.senders.add(addr[0])
+        self._pending.append(data)
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.batch_delay, self._flush)
+
+    def error_received(self, exc):
+        self.errors += 1
+        print(f"[UDP] Receive error: {exc}")
+
+    def _flush(self):
+        batch, self._pending = self._pending, []
+        self._flush_handle = None
+        self.batches += 1
+        try:
+            self.on_datagrams(batch)
+        except Exception as e:
+            self.callback_errors += 1
+            print(f"[ERROR] UDP data handler exception: {e}")
+
+
+async def serve_udp(listener, host=UDP_HOST, port=UDP_PORT):
+    """Bind `listener` and keep it receiving until cancelled."""
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(lambda: listener, local_addr=(host, port))
+    print(f"Listening for UDP frames on {host}:{transport.get_extra_info('sockname')[1]}...")
+    try:
+        await loop.create_future()
+    finally:
+        transport.close()
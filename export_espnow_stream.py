@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Stream live readings from a running gateway's shared-memory ring as CSV."""
+import argparse
+import csv
+import sys
+import time
+from datetime import datetime
+
+from espnow_shm import SharedRing, RingReader, RING_NAME
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export live ESP-NOW readings from the gateway's shared ring")
+    parser.add_argument("--ring", default=RING_NAME, help=f"Shared memory name (default {RING_NAME})")
+    parser.add_argument("--sensor", type=int, help="Only this sensor")
+    parser.add_argument("--from-start", action="store_true", help="Begin with everything still in the ring")
+    parser.add_argument("--interval", type=float, default=0.5, help="Poll interval in seconds (default 0.5)")
+    parser.add_argument("-o", "--output", help="CSV file (default stdout)")
+    args = parser.parse_args()
+
+    try:
+        ring = SharedRing.attach(args.ring)
+    except FileNotFoundError:
+        parser.error(f"no gateway ring named {args.ring}; is read_espnow_gateway_serial_v1_1.py running?")
+    reader = RingReader(ring, from_start=args.from_start)
+    out = open(args.output, "a", newline="") if args.output else sys.stdout
+    writer = csv.writer(out)
+    if not args.output or out.tell() == 0:
+        writer.writerow(["timestamp", "sensor_id", "meat", "fire"])
+
+    try:
+        while True:
+            ts, sensor, meat, fire = reader.read()
+            for t, s, m, f in zip(ts.tolist(), sensor.tolist(), meat.tolist(), fire.tolist()):
+                if args.sensor is None or s == args.sensor:
+                    writer.writerow([datetime.fromtimestamp(t).isoformat(timespec="seconds"), s, m, f])
+            out.flush()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[EXPORT] lag {reader.lag_ms:.0f} ms (max {reader.max_lag_ms:.0f}), "
+              f"{reader.behind} behind, {reader.lost} lost", file=sys.stderr)
+        if args.output:
+            out.close()
+        ring.close()
+
+
+if __name__ == "__main__":
+    main()
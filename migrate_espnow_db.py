@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Convert gateway databases from the old `temperatures` table to the compact `readings` table."""
+import argparse
+import os
+import sqlite3
+import sys
+from espnow_storage import READINGS_SCHEMA, TEMP_SCALE, add_column, upgrade_readings_key
+
+# Old timestamps are naive local ISO strings; the 'utc' modifier turns them into epoch seconds
+OLD_READINGS = f"""
+SELECT sensor_id,
+       CAST(strftime('%s', timestamp, 'utc') AS INTEGER) AS ts,
+       reading_index,
+       packet_id,
+       CAST(round(meat_temp * {TEMP_SCALE}) AS INTEGER) AS meat,
+       CAST(round(fire_temp * {TEMP_SCALE}) AS INTEGER) AS fire
+FROM temperatures
+WHERE timestamp IS NOT NULL AND sensor_id IS NOT NULL
+"""
+# Rows stored twice in the old table (retransmits) are copied once
+COPY_SQL = f"INSERT OR IGNORE INTO readings (sensor_id, ts, reading_index, packet_id, meat, fire) {OLD_READINGS}"
+# Old rows with no identical row in `readings`: unusable timestamps, or a
+# different reading under the same key. Dropping the old table loses them.
+UNCOPIED_SQL = f"""
+SELECT COUNT(*) FROM ({OLD_READINGS}) AS old
+WHERE old.ts IS NULL OR NOT EXISTS (
+    SELECT 1 FROM readings r
+    WHERE r.sensor_id = old.sensor_id AND r.ts = old.ts AND r.packet_id = old.packet_id
+      AND r.reading_index = old.reading_index AND r.meat IS old.meat AND r.fire IS old.fire)
+"""
+
+
+def file_size(path):
+    total = 0
+    for suffix in ("", "-wal"):
+        if os.path.exists(path + suffix):
+            total += os.path.getsize(path + suffix)
+    return total
+
+
+def migrate(path, drop_old=False):
+    if not os.path.exists(path):
+        print(f"[SKIP] {path}: no such file", file=sys.stderr)
+        return False
+
+    size_before = file_size(path)
+    conn = sqlite3.connect(path)
+    try:
+        has_old = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='temperatures'"
+        ).fetchone()
+        if not has_old:
+            print(f"[SKIP] {path}: no temperatures table")
+            return True
+
+        with conn:
+            conn.execute(READINGS_SCHEMA)
+            add_column("readings", "gateway_id", "INTEGER NOT NULL DEFAULT 0")(conn)
+            upgrade_readings_key(conn)
+            old_rows = conn.execute("SELECT COUNT(*) FROM temperatures").fetchone()[0]
+            copied = conn.execute(COPY_SQL).rowcount
+            # Nulls in the old table never reach the copy; they count as uncopied too
+            uncopied = conn.execute(UNCOPIED_SQL).fetchone()[0] + conn.execute(
+                "SELECT COUNT(*) FROM temperatures WHERE timestamp IS NULL OR sensor_id IS NULL").fetchone()[0]
+            if drop_old and not uncopied:
+                conn.execute("DROP TABLE temperatures")
+
+        print(f"[OK] {path}: {copied} of {old_rows} rows copied, {old_rows - copied - uncopied} already in readings")
+        if uncopied:
+            print(f"[{'ERROR' if drop_old else 'WARN'}] {path}: {uncopied} rows have no copy in readings"
+                  + ("; not dropping temperatures" if drop_old else ""), file=sys.stderr)
+            return not drop_old
+        if drop_old:
+            conn.execute("VACUUM")
+            size_after = file_size(path)
+            print(f"[OK] {path}: dropped temperatures, {size_before/1024:.0f} KB -> {size_after/1024:.0f} KB "
+                  f"({size_before / max(size_after, 1):.1f}x smaller, "
+                  f"{size_before / max(old_rows, 1):.0f} -> {size_after / max(old_rows, 1):.0f} bytes per row)")
+        return True
+    except sqlite3.Error as e:
+        print(f"[ERROR] {path}: {e}", file=sys.stderr)
+        return False
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate ESP-NOW gateway databases to the compact schema")
+    parser.add_argument("databases", nargs="+", help="Database files, e.g. test_espnow_fulltest.db")
+    parser.add_argument("--drop-old", action="store_true",
+                        help="Drop the old temperatures table and VACUUM afterwards")
+    args = parser.parse_args()
+
+    failed = [path for path in args.databases if not migrate(path, args.drop_old)]
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
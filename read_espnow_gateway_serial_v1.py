@@ -2,14 +2,14 @@ import serial
 import struct
 import time
 import sqlite3
-import queue
 import threading
 import matplotlib
 matplotlib.use("TkAgg")
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from matplotlib.animation import FuncAnimation
 from datetime import datetime, timedelta
+from espnow_history import BoundedQueue
+from espnow_plot import LivePlot
 
 # ================= CONFIG =================
 SERIAL_PORT = "/dev/serial0"
@@ -22,9 +22,10 @@ END_MAGIC   = b'\xAA\x55'
 HEARTBEAT_ID = 0xFF
 
 DB_NAME = "test_espnow_fulltest.db"
+SAMPLE_QUEUE_SIZE = 3600  # readings waiting for the plot; the oldest are dropped beyond this
 
 # ================= GLOBALS =================
-sample_queue = queue.Queue()
+sample_queue = BoundedQueue(SAMPLE_QUEUE_SIZE)
 buffer = bytearray()
 packets_received = 0
 packets_missing = 0
@@ -146,41 +147,37 @@ def serial_reader():
 # ================= PLOTTING =================
 fig, ax1 = plt.subplots()
 ax2 = ax1.twinx()
-times, meats, fires = [], [], []
+live_plot = LivePlot(fig, ax1, ax2)
+
+# Axis labels
+ax1.set_xlabel("Time")
+ax1.set_ylabel("Meat Temp (°F)", color="red")
+ax1.tick_params(axis='y', labelcolor="red")
+ax1.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+fig.autofmt_xdate()
+
+ax2.set_ylabel("Fire Temp (°F)", color="orange")
+ax2.yaxis.set_label_position('right')
+ax2.yaxis.tick_right()
+ax2.tick_params(axis='y', labelcolor="orange")
+
+# Legends (one entry per axis)
+lines1, labels1 = ax1.get_legend_handles_labels()
+lines2, labels2 = ax2.get_legend_handles_labels()
+live_plot.legend(ax1, lines1 + lines2, labels1 + labels2, loc="upper left")
+
+plt.tight_layout()
 
 def update_plot(frame):
-    while not sample_queue.empty():
-        timestamp, meat, fire = sample_queue.get()
+    times, meats, fires = [], [], []
+    for timestamp, meat, fire in sample_queue.get_all():
         times.append(timestamp)
         meats.append(meat)
         fires.append(fire)
 
-    ax1.clear()
-    ax2.clear()
-
     if times:
-        ax1.plot(times, meats, color="red", label="Meat Temp (°F)")
-        ax2.plot(times, fires, color="orange", label="Fire Temp (°F)")
-
-        ax1.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
-        fig.autofmt_xdate()
-
-    # Axis labels
-    ax1.set_xlabel("Time")
-    ax1.set_ylabel("Meat Temp (°F)", color="red")
-    ax1.tick_params(axis='y', labelcolor="red")
-
-    ax2.set_ylabel("Fire Temp (°F)", color="orange")
-    ax2.yaxis.set_label_position('right')
-    ax2.yaxis.tick_right()
-    ax2.tick_params(axis='y', labelcolor="orange")
-
-    # Legends (one entry per axis)
-    lines1, labels1 = ax1.get_legend_handles_labels()
-    lines2, labels2 = ax2.get_legend_handles_labels()
-    ax1.legend(lines1 + lines2, labels1 + labels2, loc="upper left")
-
-    plt.tight_layout()
+        live_plot.extend(mdates.date2num(times), meats, fires)
+    live_plot.refresh()
 
 # ================= MAIN =================
 if __name__ == "__main__":
@@ -205,5 +202,8 @@ if __name__ == "__main__":
             show_stats()
 
     threading.Thread(target=stats_loop, daemon=True).start()
-    ani = FuncAnimation(fig, update_plot, interval=1000)
+    # A plain timer: only the lines are blitted each second, no full redraw
+    plot_timer = fig.canvas.new_timer(interval=1000)
+    plot_timer.add_callback(update_plot, None)
+    plot_timer.start()
     plt.show()
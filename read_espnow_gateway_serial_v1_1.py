@@ -1,58 +1,153 @@
-import serial
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
 import struct
 import time
 import sqlite3
-import queue
 import threading
-import matplotlib
-matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from datetime import datetime, timedelta
+from collections import Counter
+from contextlib import closing
+import numpy as np
+from datetime import datetime
+from espnow_capture import CaptureWriter
+from espnow_decoder import FrameDecoder, ReadingCollector, BATCH_HEADER, batch_header
+from espnow_serial import SerialStream
+from espnow_udp import DatagramListener, serve_udp, split_datagram, UDP_HOST
+from espnow_heartbeats import HeartbeatTracker, HEARTBEAT_SCHEMA, UPSERT_HEARTBEAT
+from espnow_link_stats import LinkTracker, DuplicateFilter, LINK_STATS_SCHEMA, INSERT_LINK_STATS
+from espnow_history import RingStore, BoundedQueue, DROP_OLDEST
+from espnow_http import LiveServer, HTTP_HOST, HTTP_PORT
+from espnow_rollups import Maintenance, ROLLUP_SCHEMA, ROLLUP_INTERVAL_SEC, RAW_RETENTION_DAYS, readings_for_span
+from espnow_shm import SharedRing, RingReader, RING_NAME
+from espnow_storage import (StorageProcess, READINGS_SCHEMA, INSERT_READING, TEMP_SCALE, upgrade_readings_key,
+                            enable_incremental_vacuum, add_column)
 
 # ================= CONFIG =================
 SERIAL_PORT = "/dev/serial0"
 BAUD_RATE = 115200
-BUFFER_SIZE = 5
+BUFFER_SIZE = 5        # readings in a fixed-size packet
 READ_INTERVAL_SEC = 2  # time between readings within a batch
+SENSOR_READ_INTERVALS = {}  # sensor_id -> seconds, for sensors that differ from READ_INTERVAL_SEC
 
 START_MAGIC = b'\x55\xAA'
 END_MAGIC   = b'\xAA\x55'
 HEARTBEAT_ID = 0xFF
+SENSOR_PACKET_LEN = 2 + BUFFER_SIZE*2*2
 
 DB_NAME = "test_espnow_fulltest.db"
 
+HISTORY_SIZE = 8 * 3600            # readings kept in memory; older ones come from the DB
+SAMPLE_QUEUE_SIZE = 256            # decoded batches waiting for the plot / HTTP clients
+SAMPLE_QUEUE_POLICY = DROP_OLDEST  # or LATEST to only keep the newest batch
+LINK_STATS_PERSIST_SEC = 60        # how often per-sensor link stats are written to link_stats
+PLOT_INTERVAL_MS = 1000            # how often the plot process polls the shared ring
+
+# ================= ARGUMENTS =================
+parser = argparse.ArgumentParser(description="ESP-NOW serial gateway reader",
+                                 epilog="Several gateways can be read at once: --port /dev/ttyUSB0 --port /dev/ttyUSB1, "
+                                        "optionally with explicit ids (--port 2=/dev/ttyACM0). --udp adds a "
+                                        "network input for Wi-Fi ESP32s; without --port no serial port is opened.")
+parser.add_argument("--headless", action="store_true",
+                    help="No plot window: serve live data over HTTP (JSON snapshot + SSE stream)")
+parser.add_argument("--http-port", type=int, default=HTTP_PORT)
+parser.add_argument("--port", metavar="[ID=]PORT", action="append",
+                    help=f"Serial port of a gateway, repeatable; ids default to 0, 1, ... (default {SERIAL_PORT})")
+parser.add_argument("--udp", metavar="[ID=][HOST:]PORT", action="append",
+                    help=f"Also accept framed or bare sensor packets as UDP datagrams (host default {UDP_HOST})")
+parser.add_argument("--baud", type=int, default=BAUD_RATE)
+parser.add_argument("--db", default=DB_NAME, help=f"SQLite database (default {DB_NAME})")
+parser.add_argument("--read-interval", metavar="SENSOR=SEC", action="append", default=[],
+                    help="Reading interval of one sensor's fixed-size packets (repeatable)")
+parser.add_argument("--keep-days", type=float, default=RAW_RETENTION_DAYS,
+                    help=f"Days of raw readings and heartbeats to keep; older data survives in the 1m/15m "
+                         f"rollups (default {RAW_RETENTION_DAYS}, 0 = keep everything)")
+parser.add_argument("--ring", default=RING_NAME,
+                    help=f"Shared memory name of the live readings ring for UI/export processes (default {RING_NAME})")
+parser.add_argument("--capture", metavar="FILE",
+                    help="Also write every raw serial chunk to FILE for replay_espnow_capture.py "
+                         "(one FILE.gw<ID> per gateway when there are several)")
+args, unknown = parser.parse_known_args()
+for item in args.read_interval:
+    try:
+        sensor, sec = item.split("=")
+        SENSOR_READ_INTERVALS[int(sensor)] = float(sec)
+    except ValueError:
+        parser.error(f"--read-interval expects SENSOR=SEC, got {item!r}")
+
+GATEWAY_PORTS = {}   # gateway_id -> serial port, or (host, port) for UDP
+def add_gateway_port(option, item, index):
+    gateway_id, sep, port = item.rpartition("=")
+    try:
+        gateway_id = int(gateway_id) if sep else index
+        if option == "--udp":
+            host, _, udp_port = port.rpartition(":")
+            port = (host or UDP_HOST, int(udp_port))
+    except ValueError:
+        parser.error(f"{option} expects {'[ID=][HOST:]PORT' if option == '--udp' else '[ID=]PORT'}, got {item!r}")
+    if gateway_id in GATEWAY_PORTS:
+        parser.error(f"gateway id {gateway_id} is used twice")
+    GATEWAY_PORTS[gateway_id] = port
+
+serial_ports = args.port or ([] if args.udp else [SERIAL_PORT])
+for index, item in enumerate(serial_ports):
+    add_gateway_port("--port", item, index)
+for index, item in enumerate(args.udp or []):
+    add_gateway_port("--udp", item, len(serial_ports) + index)
+
+# matplotlib is only loaded when there is a window to draw in
+if not args.headless:
+    import matplotlib
+    matplotlib.use("TkAgg")
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    from espnow_plot import LivePlot, epoch_to_datenum
+
 # ================= GLOBALS =================
-sample_queue = queue.Queue()
-buffer = bytearray()
+sample_queue = BoundedQueue(SAMPLE_QUEUE_SIZE, SAMPLE_QUEUE_POLICY)
+history = RingStore(HISTORY_SIZE)
 packets_received = 0
 packets_missing = 0
 packets_malformed = 0
-last_packet_id = {}
+packets_duplicate = 0
+duplicate_filter = DuplicateFilter()
+heartbeat_tracker = HeartbeatTracker()
+link_tracker = LinkTracker()
 last_packet_time = None
+ingest_last_ms = 0.0
+ingest_max_ms = 0.0
+ui_stats = None     # shared with the plot process: behind, lag_ms, max_lag_ms, lost
 
 # ================= DATABASE =================
-conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-c = conn.cursor()
-c.execute("""
-CREATE TABLE IF NOT EXISTS temperatures (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    timestamp TEXT,
-    packet_id INTEGER,
-    sensor_id INTEGER,
-    reading_index INTEGER,
-    meat_temp REAL,
-    fire_temp REAL
-)
-""")
-c.execute("""
-CREATE TABLE IF NOT EXISTS heartbeat (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    timestamp TEXT,
-    message TEXT
-)
-""")
-conn.commit()
+# Readings use the compact `readings` table from espnow_storage; older
+# databases with a `temperatures` table can be converted with migrate_espnow_db.py.
+# Heartbeats are change-compressed into `heartbeat_log`; the old one-row-per-
+# heartbeat `heartbeat` table of existing databases is only pruned.
+SCHEMA = [enable_incremental_vacuum, READINGS_SCHEMA, add_column("readings", "gateway_id", "INTEGER NOT NULL DEFAULT 0"),
+          upgrade_readings_key, LINK_STATS_SCHEMA] + HEARTBEAT_SCHEMA + ROLLUP_SCHEMA
+
+# All writes go through a storage process with its own connection, so
+# commits never compete with the serial reader for the GIL. The same
+# connection keeps the 1m/15m rollups current and prunes old raw data.
+db_writer = StorageProcess(args.db, schema=SCHEMA,
+                           periodic=[(ROLLUP_INTERVAL_SEC, Maintenance(args.keep_days))])
+db_writer.start()
+
+# ================= LIVE RING =================
+# Decoded readings are published here for the plot process and for any
+# export tool that attaches by name (see export_espnow_stream.py)
+try:
+    ring = SharedRing.create(args.ring)
+except FileExistsError:
+    # Left over from a crash, or another gateway is running: do not touch it
+    ring = SharedRing.create(f"{args.ring}_{os.getpid()}")
+    print(f"[WARN] Shared memory {args.ring} already exists; using {ring.name}")
+
+def load_older_readings(sensor_id, since, until):
+    """Fallback for history.since(): readings that are no longer in memory (rollups for long spans)."""
+    with closing(sqlite3.connect(args.db)) as conn:
+        return readings_for_span(conn, sensor_id, since, until)
 
 # ================= HELPERS =================
 def round_half_degree(x):
@@ -62,6 +157,13 @@ def round_to_second(dt):
     return dt.replace(microsecond=0)
 
 # ================= PARSER =================
+def is_packet(packet_bytes):
+    """Whether `packet_bytes` has the length of a sensor, batch or heartbeat packet."""
+    if len(packet_bytes) < 2:
+        return False
+    return (packet_bytes[1] == HEARTBEAT_ID or len(packet_bytes) == SENSOR_PACKET_LEN
+            or batch_header(packet_bytes) is not None)
+
 def parse_packet(packet_bytes):
     """Parse a packet; return (packetId, sensorId, data_or_msg) or None if invalid."""
     global packets_malformed
@@ -74,14 +176,15 @@ def parse_packet(packet_bytes):
 
         # Heartbeat case
         if sensorId == HEARTBEAT_ID:
-            msg = packet_bytes[1:].split(b'\x00', 1)[0].decode(errors='ignore')
+            msg = bytes(packet_bytes[1:]).split(b'\x00', 1)[0].decode(errors='ignore')
             return packetId, sensorId, msg
 
         # Normal sensor packet: validate expected length
-        expected_len = 2 + BUFFER_SIZE*2*2
+        expected_len = SENSOR_PACKET_LEN
         if len(packet_bytes) != expected_len:
             packets_malformed += 1
-            print(f"[WARN] Invalid packet length: {len(packet_bytes)} expected {expected_len}")
+            print(f"[WARN] Invalid packet length: {len(packet_bytes)} expected {expected_len} "
+                  f"or a batch packet with a matching reading count")
             return None
 
         temps = []
@@ -96,98 +199,251 @@ def parse_packet(packet_bytes):
         print(f"[ERROR] Exception in parse_packet: {e}")
         return None
 
-# ================= SERIAL READER THREAD =================
+# ================= BATCH HANDLING =================
+def reading_interval(sensor_id, interval):
+    """Seconds between a packet's readings; 0 means the packet did not say."""
+    return interval or SENSOR_READ_INTERVALS.get(sensor_id, READ_INTERVAL_SEC)
+
+def handle_sensor_batch(packets, now, gateway_id):
+    """Store and queue every sensor packet collected from one serial chunk."""
+    global packets_received, packets_missing, last_packet_time
+    batch = packets.decode()
+    arrival = time.monotonic()
+
+    for packetId, sensorId, count in zip(packets.packet_ids, packets.sensor_ids, packets.counts):
+        packets_received += 1
+        packets_missing += link_tracker.update(sensorId, packetId, arrival)
+        print(f"[ESP32 SENSOR] Packet {packetId}, Sensor {sensorId}, {count} readings")
+    last_packet_time = now
+
+    # A backlog can hold several packets per sensor: the last one ends at `now`,
+    # each earlier one ends where the readings of the packet after it begin
+    now_ts = now.timestamp()
+    intervals = [reading_interval(s, i) for s, i in zip(packets.sensor_ids, packets.intervals)]
+    later = Counter()     # sensor_id -> seconds covered by its later packets
+    packet_end = [0.0] * len(packets)
+    for i in reversed(range(len(packets))):
+        sensorId = packets.sensor_ids[i]
+        packet_end[i] = now_ts - later[sensorId]
+        later[sensorId] += packets.counts[i] * intervals[i]
+
+    # Readings inside a packet are its interval apart, ending at the packet end
+    counts = packets.counts
+    ts = (np.repeat(packet_end, counts)
+          - (np.repeat(counts, counts) - 1 - batch.reading_index)*np.repeat(intervals, counts))
+
+    db_writer.insert(INSERT_READING, list(zip(
+        batch.sensor_id.tolist(), np.rint(ts).astype(np.int64).tolist(), batch.reading_index.tolist(),
+        batch.packet_id.tolist(),
+        np.rint(batch.meat*TEMP_SCALE).astype(np.int64).tolist(),
+        np.rint(batch.fire*TEMP_SCALE).astype(np.int64).tolist(),
+        [gateway_id] * len(ts))))
+    ring.write(ts, batch.sensor_id, batch.meat, batch.fire)
+    if args.headless:
+        history.extend(ts, batch.sensor_id, batch.meat, batch.fire)
+        sample_queue.put((ts, batch.sensor_id, batch.meat, batch.fire))
+
+# ================= SERIAL INPUT =================
+class Gateway:
+    """One serial ESP-NOW gateway: its port, its own framing state and optional capture."""
+
+    def __init__(self, gateway_id, port, capture_path=None):
+        self.id = gateway_id
+        self.port = port
+        # Framing state belongs to one byte stream; everything after it is shared
+        self.decoder = FrameDecoder(START_MAGIC, END_MAGIC)
+        self.capture = CaptureWriter(capture_path) if capture_path else None
+        # A frame cut off by a disconnect cannot be completed by the next connection
+        self.stream = SerialStream(port, args.baud, self.on_data, on_reconnect=self.decoder.reset)
+        self.packets = 0
+
+    def run(self):
+        return self.stream.run()
+
+    def in_waiting(self):
+        return self.stream.in_waiting()
+
+    def buffered(self):
+        return self.decoder.buffered()
+
+    def on_data(self, chunk):
+        global ingest_last_ms, ingest_max_ms
+        t0 = time.perf_counter()
+        if self.capture:
+            self.capture.write(chunk)
+        process_payloads(self, self.decoder.feed(chunk))
+        ingest_last_ms = (time.perf_counter() - t0) * 1000
+        ingest_max_ms = max(ingest_max_ms, ingest_last_ms)
+
+    def stats(self):
+        return {
+            "gateway_id": self.id,
+            "port": self.port,
+            "connected": self.stream.connected,
+            "bytes_read": self.stream.bytes_read,
+            "frames": self.decoder.frames,
+            "packets": self.packets,
+            "bytes_discarded": self.decoder.bytes_discarded,
+            "resyncs": self.decoder.resyncs,
+            "reconnects": self.stream.reconnects,
+        }
+
+class UdpGateway:
+    """Sensor packets arriving as UDP datagrams, tagged with a gateway id like a serial port."""
+
+    def __init__(self, gateway_id, address):
+        self.id = gateway_id
+        self.address = address
+        self.port = "udp:%s:%d" % address
+        self.capture = None
+        self.listener = DatagramListener(self.on_datagrams)
+        self.packets = 0
+        self.bytes_discarded = 0
+
+    def run(self):
+        return serve_udp(self.listener, *self.address)
+
+    def in_waiting(self):
+        return 0
+
+    def buffered(self):
+        return 0
+
+    def on_datagrams(self, datagrams):
+        global ingest_last_ms, ingest_max_ms
+        t0 = time.perf_counter()
+        payloads = []
+        for data in datagrams:
+            frames, discarded = split_datagram(data, START_MAGIC, END_MAGIC, is_packet)
+            payloads += frames
+            self.bytes_discarded += discarded
+        process_payloads(self, payloads)
+        ingest_last_ms = (time.perf_counter() - t0) * 1000
+        ingest_max_ms = max(ingest_max_ms, ingest_last_ms)
+
+    def stats(self):
+        return {
+            "gateway_id": self.id,
+            "port": self.port,
+            "connected": True,
+            "bytes_read": self.listener.bytes_read,
+            "frames": self.listener.datagrams,
+            "packets": self.packets,
+            "bytes_discarded": self.bytes_discarded,
+            "resyncs": 0,
+            "reconnects": 0,
+            "senders": len(self.listener.senders),
+            "batches": self.listener.batches,
+        }
+
+def capture_path(gateway_id):
+    serial_count = sum(isinstance(port, str) for port in GATEWAY_PORTS.values())
+    if not args.capture or serial_count == 1:
+        return args.capture
+    return f"{args.capture}.gw{gateway_id}"
+
+gateways = [Gateway(gateway_id, port, capture_path(gateway_id)) if isinstance(port, str)
+            else UdpGateway(gateway_id, port)
+            for gateway_id, port in GATEWAY_PORTS.items()]
+
+def process_payloads(gateway, payloads):
+    """Decode the framed payloads of one read (serial chunk or UDP batch); runs on the input thread."""
+    global packets_duplicate
+    now = round_to_second(datetime.now())
+    arrival = time.monotonic()
+    packets = ReadingCollector()
+    # packet_bytes may be a view into the decoder buffer, valid for this iteration only
+    for packet_bytes in payloads:
+        header = None
+        if len(packet_bytes) >= 2 and packet_bytes[1] != HEARTBEAT_ID:
+            if len(packet_bytes) == SENSOR_PACKET_LEN:
+                header, offset = (packet_bytes[0], packet_bytes[1], BUFFER_SIZE, 0), 2
+            else:
+                header, offset = batch_header(packet_bytes), BATCH_HEADER.size
+        if header:
+            # Retransmits (and a sensor heard by two gateways) are dropped before
+            # they are decoded, stored or counted as received
+            if duplicate_filter.seen(header[1], header[0], arrival):
+                packets_duplicate += 1
+                continue
+            packets.add(*header, packet_bytes[offset:])
+            continue
+
+        # Heartbeats and malformed frames go through the per-packet parser
+        result = parse_packet(packet_bytes)
+        if not result:
+            continue
+
+        packetId, sensorId, data = result
+        rows = heartbeat_tracker.update(gateway.id, data)
+        if rows:
+            # Only a new message or a periodic summary reaches the database
+            if rows[-1][3] == 1:
+                print(f"[HEARTBEAT] Gateway {gateway.id}: {data}")
+            db_writer.insert(UPSERT_HEARTBEAT, rows)
+
+    if packets:
+        gateway.packets += len(packets)
+        handle_sensor_batch(packets, now, gateway.id)
+
 def serial_reader():
-    global buffer, packets_received, packets_missing, last_packet_id, last_packet_time
-    try:
-        ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=0.1)
-    except Exception as e:
-        print(f"[FATAL] Could not open serial port {SERIAL_PORT}: {e}")
-        return
+    """Thread target: run every serial and UDP input on one event loop until the process exits."""
+    async def run_all():
+        await asyncio.gather(*(gateway.run() for gateway in gateways))
+    asyncio.run(run_all())
 
-    print(f"Listening on {SERIAL_PORT} at {BAUD_RATE} baud...")
-    time.sleep(2)
+# ================= STATS =================
+def stage_stats():
+    """Queue depth and lag of each pipeline stage."""
+    stages = {
+        "ingest": {
+            "serial_waiting_bytes": sum(gateway.in_waiting() for gateway in gateways),
+            "decoder_buffered_bytes": sum(gateway.buffered() for gateway in gateways),
+            "chunk_ms": ingest_last_ms,
+            "max_chunk_ms": ingest_max_ms,
+            "ring_written": ring.written,
+        },
+        "storage": {
+            "queued": db_writer.qsize(),
+            "lag_ms": db_writer.lag_ms,
+            "max_lag_ms": db_writer.max_lag_ms,
+            "rows_dropped": int(db_writer.rows_dropped),
+            "rows_rejected": int(db_writer.rows_rejected),
+        },
+    }
+    if ui_stats is not None:
+        behind, lag_ms, max_lag_ms, lost = ui_stats
+        stages["ui"] = {"behind": int(behind), "lag_ms": lag_ms, "max_lag_ms": max_lag_ms, "lost": int(lost)}
+    if args.headless:
+        stages["http"] = {"queued": sample_queue.qsize(), "max_queued": sample_queue.max_depth,
+                          "dropped": sample_queue.dropped}
+    return stages
 
-    try:
-        while True:
-            try:
-                chunk = ser.read(ser.in_waiting or 1)
-                if chunk:
-                    buffer.extend(chunk)
-
-                while True:
-                    start_index = buffer.find(START_MAGIC)
-                    end_index = buffer.find(END_MAGIC, start_index + 2)
-                    if start_index == -1 or end_index == -1:
-                        break
-
-                    packet_bytes = buffer[start_index + 2:end_index]
-                    buffer = buffer[end_index + len(END_MAGIC):]
-
-                    result = parse_packet(packet_bytes)
-                    if not result:
-                        continue
-
-                    packetId, sensorId, data = result
-                    now = round_to_second(datetime.now())
-
-                    if sensorId == HEARTBEAT_ID:
-                        print(f"[HEARTBEAT] {data}")
-                        try:
-                            c.execute(
-                                "INSERT INTO heartbeat (timestamp, message) VALUES (?, ?)",
-                                (now.isoformat(), data)
-                            )
-                            conn.commit()
-                        except Exception as e:
-                            print(f"[DB ERROR] Failed to log heartbeat: {e}")
-                    else:
-                        # Update stats
-                        packets_received += 1
-                        if sensorId in last_packet_id:
-                            gap = packetId - last_packet_id[sensorId] - 1
-                            if gap > 0:
-                                packets_missing += gap
-                        last_packet_id[sensorId] = packetId
-                        last_packet_time = now
-
-                        print(f"[ESP32 SENSOR] Packet {packetId}, Sensor {sensorId}")
-                        for i, (meat, fire) in enumerate(data):
-                            reading_time = now - timedelta(seconds=(BUFFER_SIZE - i - 1)*READ_INTERVAL_SEC)
-                            reading_time = round_to_second(reading_time)
-                            print(f"  Reading {i}: {meat:.1f}°F, {fire:.1f}°F @ {reading_time}")
-
-                            try:
-                                c.execute(
-                                    "INSERT INTO temperatures (timestamp, packet_id, sensor_id, reading_index, meat_temp, fire_temp) VALUES (?, ?, ?, ?, ?, ?)",
-                                    (reading_time.isoformat(), packetId, sensorId, i, meat, fire)
-                                )
-                                conn.commit()
-                            except Exception as e:
-                                print(f"[DB ERROR] Failed to log temperature: {e}")
-                            sample_queue.put((reading_time, meat, fire))
-            except Exception as e:
-                print(f"[ERROR] Serial loop exception: {e}")
-                time.sleep(0.5)
-    finally:
-        ser.close()
+def packet_stats():
+    total_expected = packets_received + packets_missing
+    return {
+        "packets_received": packets_received,
+        "packets_missing": packets_missing,
+        "packets_malformed": packets_malformed,
+        "packets_duplicate": packets_duplicate,
+        "duplicates_by_sensor": duplicate_filter.duplicates,
+        "bytes_discarded": sum(gateway.stats()["bytes_discarded"] for gateway in gateways),
+        "gateways": [gateway.stats() for gateway in gateways],
+        "percent_received": (packets_received / total_expected * 100) if total_expected > 0 else 100,
+        "last_packet_time": last_packet_time.isoformat() if last_packet_time else None,
+        "sensors": link_tracker.snapshot(),
+        "heartbeats": heartbeat_tracker.snapshot(),
+        "history_readings": len(history),
+        "db_rows_written": int(db_writer.rows_written),
+        "stages": stage_stats(),
+    }
 
 # ================= PLOTTING =================
-fig, ax1 = plt.subplots()
-ax2 = ax1.twinx()
-times, meats, fires = [], [], []
-
-def update_plot(frame):
-    while not sample_queue.empty():
-        timestamp, meat, fire = sample_queue.get()
-        times.append(timestamp)
-        meats.append(meat)
-        fires.append(fire)
-
-    ax1.clear()
-    ax2.clear()
-    ax1.plot(times, meats, color="red", label="Meat Temp (°F)")
-    ax2.plot(times, fires, color="orange", label="Fire Temp (°F)")
+def setup_plot():
+    global fig, ax1, ax2, live_plot
+    fig, ax1 = plt.subplots()
+    ax2 = ax1.twinx()
+    live_plot = LivePlot(fig, ax1, ax2)
 
     ax1.set_xlabel("Timestamp")
     ax1.set_ylabel("Meat Temp (°F)", color="red")
@@ -196,11 +452,55 @@ def update_plot(frame):
     ax2.yaxis.tick_right()
     ax1.tick_params(axis='y', labelcolor="red")
     ax2.tick_params(axis='y', labelcolor="orange")
-    ax1.legend(loc="upper left")
-    ax2.legend(loc="upper right")
-    plt.xticks(rotation=45)
+    ax1.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+    live_plot.legend(ax1, loc="upper left")
+    live_plot.legend(ax2, loc="upper right")
+    plt.setp(ax1.get_xticklabels(), rotation=45)
     plt.tight_layout()
 
+def update_plot(reader):
+    ts, _, batch_meats, batch_fires = reader.read()
+    if len(ts):
+        live_plot.extend(epoch_to_datenum(ts).tolist(), batch_meats.tolist(), batch_fires.tolist())
+    live_plot.refresh()
+    ui_stats[:] = [reader.behind, reader.lag_ms, reader.max_lag_ms, reader.lost]
+
+def run_plot():
+    """Target of the plot process: draws whatever the reader publishes to the ring."""
+    reader = RingReader(ring)
+    setup_plot()
+    # A plain timer: only the lines are blitted each second, no full redraw
+    plot_timer = fig.canvas.new_timer(interval=PLOT_INTERVAL_MS)
+    plot_timer.add_callback(update_plot, reader)
+    plot_timer.start()
+    plt.show()
+
+# ================= HEADLESS =================
+def run_headless():
+    server = LiveServer(history, stats=packet_stats, load_older=load_older_readings,
+                        host=HTTP_HOST, port=args.http_port)
+
+    def publish_loop():
+        while True:
+            item = sample_queue.get(timeout=1.0)
+            if item is not None:
+                server.publish(*item)
+
+    def shutdown_handler(signum, frame):
+        print("[INFO] Shutting down gracefully...")
+        # shutdown() waits for serve_forever(), so it cannot run on this thread
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGINT, shutdown_handler)
+    signal.signal(signal.SIGTERM, shutdown_handler)
+
+    threading.Thread(target=publish_loop, daemon=True).start()
+    print(f"Serving live data on http://{HTTP_HOST}:{args.http_port}/ (snapshot: /api/snapshot, stream: /api/stream)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
 # ================= MAIN =================
 if __name__ == "__main__":
     # Show initial statistics
@@ -212,19 +512,80 @@ if __name__ == "__main__":
         print(f"Packets received : {packets_received}")
         print(f"Packets missing  : {packets_missing}")
         print(f"Packets malformed: {packets_malformed}")
+        print(f"Packets duplicate: {packets_duplicate}")
+        for g in (gateway.stats() for gateway in gateways):
+            print(f"Gateway {g['gateway_id']:<9}: {g['port']} {'up' if g['connected'] else 'DOWN'}, "
+                  f"{g['bytes_read']} B, {g['packets']} packets, discarded {g['bytes_discarded']} B "
+                  f"({g['resyncs']} resyncs), reconnects {g['reconnects']}")
+        link_tracker.print_summary()
+        for hb in heartbeat_tracker.snapshot():
+            print(f"Heartbeat gw {hb['gateway_id']:<5}: \"{hb['message']}\" x{hb['count']}, "
+                  f"last {hb['since_last_s']:.0f} s ago")
+        print(f"Heartbeats       : {heartbeat_tracker.received} received, {heartbeat_tracker.rows_out} rows written")
         print(f"Percent received : {percent_received:.1f}%")
         print(f"Minutes since last packet: {minutes_since_last:.1f}")
+        stages = stage_stats()
+        ingest = stages["ingest"]
+        print(f"Ingest           : chunk {ingest['chunk_ms']:.1f} ms (max {ingest['max_chunk_ms']:.1f}), "
+              f"serial waiting {ingest['serial_waiting_bytes']} B, decoder {ingest['decoder_buffered_bytes']} B, "
+              f"ring {ring.name} at {ingest['ring_written']}")
+        print(f"Storage          : {db_writer.stats_line()}")
+        if "ui" in stages:
+            ui = stages["ui"]
+            print(f"Plot             : {ui['behind']} readings behind, lag {ui['lag_ms']:.0f} ms "
+                  f"(max {ui['max_lag_ms']:.0f}), lost {ui['lost']}")
+        if args.headless:
+            print(f"Live history     : {len(history)}/{history.capacity} readings, "
+                  f"queue {sample_queue.qsize()} (max {sample_queue.max_depth}, dropped {sample_queue.dropped})")
         print("=============================")
 
+    # The plot gets its own process; it is forked before any thread starts
+    ui_process = None
+    if not args.headless:
+        ctx = multiprocessing.get_context("fork")
+        ui_stats = ctx.Array("d", 4, lock=False)
+        ui_process = ctx.Process(target=run_plot, name="espnow-plot", daemon=True)
+        ui_process.start()
+
     t = threading.Thread(target=serial_reader, daemon=True)
     t.start()
 
-    # Periodically display stats
+    if not args.headless:
+        # Like Ctrl+C: leave ui_process.join() and flush in the finally below.
+        # Installed after the fork, so the plot process keeps the default.
+        def shutdown_handler(signum, frame):
+            raise KeyboardInterrupt
+        signal.signal(signal.SIGTERM, shutdown_handler)
+
+    # Periodically display stats and persist per-sensor link stats
     def stats_loop():
+        last_persist = time.monotonic()
         while True:
             time.sleep(10)
             show_stats()
+            if time.monotonic() - last_persist >= LINK_STATS_PERSIST_SEC:
+                last_persist = time.monotonic()
+                db_writer.insert(INSERT_LINK_STATS, link_tracker.rows())
 
     threading.Thread(target=stats_loop, daemon=True).start()
-    ani = FuncAnimation(fig, update_plot, interval=1000)
-    plt.show()
+    try:
+        if args.headless:
+            run_headless()
+        else:
+            # Closing the plot window ends the gateway, as before
+            ui_process.join()
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down gracefully...")
+    finally:
+        # Commit whatever the reader queued before shutting down
+        heartbeat_rows = heartbeat_tracker.flush()
+        if heartbeat_rows:
+            db_writer.insert(UPSERT_HEARTBEAT, heartbeat_rows)
+        db_writer.close()
+        print(f"[DB] Flushed on shutdown: {db_writer.stats_line()}")
+        ring.close()
+        for gateway in gateways:
+            if gateway.capture:
+                gateway.capture.close()
+                print(f"[CAPTURE] {gateway.capture.chunks} chunks, {gateway.capture.bytes} bytes "
+                      f"written to {gateway.capture.path}")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Replay a raw serial capture into the gateway reader through a fake (pty) serial port."""
+import argparse
+import os
+import pty
+import signal
+import subprocess
+import sys
+import time
+import tty
+from espnow_capture import read_capture
+
+GATEWAY_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "read_espnow_gateway_serial_v1_1.py")
+DEFAULT_GATEWAY_ARGS = ["--headless", "--http-port", "0", "--db", "replay_espnow.db"]
+
+
+def open_fake_port():
+    """
+    Return (master_fd, slave_path, slave_fd) of a raw pty that serial.Serial can open like a UART.
+
+    The caller closes slave_fd after the replay; holding it keeps the pty
+    alive while the reader opens and reopens the port.
+    """
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    return master, os.ttyname(slave), slave
+
+
+def replay(path, master, speed=1.0):
+    """Write every captured chunk to `master`; speed 0 means as fast as the reader takes it."""
+    chunks = total = 0
+    start = time.monotonic()
+    first = None
+    for t, chunk in read_capture(path):
+        if first is None:
+            first = t
+        if speed > 0:
+            delay = start + (t - first) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        # A full pty buffer blocks here, which throttles max-speed replays to the reader
+        os.write(master, chunk)
+        chunks += 1
+        total += len(chunk)
+    return chunks, total, time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay an ESP-NOW gateway capture",
+                                     epilog="Arguments after -- replace the default gateway arguments "
+                                            f"({' '.join(DEFAULT_GATEWAY_ARGS)}).")
+    parser.add_argument("capture", help="Capture written with read_espnow_gateway_serial_v1_1.py --capture")
+    speed = parser.add_mutually_exclusive_group()
+    speed.add_argument("--speed", type=float, default=1.0, help="Replay speed factor (default 1x)")
+    speed.add_argument("--max", action="store_true", help="Replay as fast as the reader can take it")
+    parser.add_argument("--no-gateway", action="store_true",
+                        help="Only provide the fake port; start the reader yourself with --port")
+    parser.add_argument("--start-delay", type=float, default=3.0,
+                        help="Seconds to wait for the reader to open the port (default 3)")
+    parser.add_argument("--drain", type=float, default=3.0,
+                        help="Seconds to let the reader catch up before stopping it (default 3)")
+    args, gateway_args = parser.parse_known_args()
+    if gateway_args and gateway_args[0] == "--":
+        gateway_args = gateway_args[1:]
+
+    master, port, slave = open_fake_port()
+    print(f"Fake serial port: {port}")
+
+    gateway = None
+    if not args.no_gateway:
+        cmd = [sys.executable, GATEWAY_SCRIPT, "--port", port] + (gateway_args or DEFAULT_GATEWAY_ARGS)
+        print("Starting reader:", " ".join(cmd))
+        gateway = subprocess.Popen(cmd)
+    else:
+        input("Start the reader on the port above, then press Enter to replay...")
+    time.sleep(args.start_delay)
+
+    try:
+        chunks, total, elapsed = replay(args.capture, master, 0 if args.max else args.speed)
+        print(f"[REPLAY] {chunks} chunks, {total} bytes in {elapsed:.2f}s")
+        time.sleep(args.drain)
+    finally:
+        if gateway:
+            gateway.send_signal(signal.SIGINT)
+            gateway.wait(timeout=30)
+        os.close(master)
+        os.close(slave)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Threshold alerts for the smoker monitors.
+
+Rules come from temp_limits.json: every key named <probe>_upper,
+<probe>_lower, <probe>_rate_upper or <probe>_rate_lower (probe = meat or
+fire; rates in F/min) is one rule, e.g. fire_upper: 275 or
+fire_rate_lower: -5 for a fire dropping more than 5 F a minute. Rates
+are the least-squares slope over the monitors' 1-minute window (see
+windowed_rate), not the per-sample filter rate, which is too noisy on the
+fire probe to alert on. A rule fires when its value crosses the limit and
+clears only once it is back inside by the hysteresis band, so noise
+around a limit does not flap. Lower limits only arm once the value has
+been above them, so a smoker that is still warming up does not trip
+fire_lower. While a rule stays active it repeats at most once per
+cooldown. Alerts raised within ALERT_BATCH_SECONDS of each other go out
+as one message. Limits that are not numbers are ignored.
+
+The file is checked for changes every RELOAD_CHECK_SECONDS, so limits set
+with telegram_listener.py's setlimit apply without a restart.
+"""
+import json
+import math
+import os
+import re
+
+# ------------------- Config -------------------
+CONFIG_FILE = "config.json"
+ALERT_COOLDOWN_SECONDS = 600    # default; config.json or temp_limits.json alert_cooldown_seconds wins
+TEMP_HYSTERESIS = 5.0           # F;     override with "hysteresis" in temp_limits.json
+RATE_HYSTERESIS = 1.0           # F/min; override with "rate_hysteresis"
+ALERT_BATCH_SECONDS = 2
+RELOAD_CHECK_SECONDS = 2
+RATE_MIN_SPAN_FRACTION = 0.5    # rate rules wait until a window's samples cover this share of it
+
+RULE_KEY = re.compile(r"^(meat|fire)_(rate_)?(upper|lower)$")
+NUMERIC_SETTINGS = ("hysteresis", "rate_hysteresis", "alert_cooldown_seconds")
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def windowed_rate(window, min_span=None):
+    """F/min slope of a smoker_stats.RollingWindow for the rate rules; NaN until it spans enough time."""
+    if min_span is None:
+        min_span = window.seconds * RATE_MIN_SPAN_FRACTION
+    return window.slope * 60 if window.span >= min_span else math.nan
+
+
+def load_default_cooldown(path=CONFIG_FILE):
+    try:
+        with open(path) as f:
+            return float(json.load(f).get("alert_cooldown_seconds", ALERT_COOLDOWN_SECONDS))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return ALERT_COOLDOWN_SECONDS
+
+
+# ------------------- Rule -------------------
+class AlertRule:
+    """One limit on one value ('meat', 'fire', 'meat_rate' or 'fire_rate'); check() is O(1)."""
+
+    def __init__(self, key, source, upper, threshold, hysteresis, cooldown):
+        self.key = key
+        self.source = source
+        self.upper = upper
+        self.threshold = threshold
+        self.hysteresis = hysteresis
+        self.cooldown = cooldown
+        self.armed = upper          # lower limits arm once the value has been above them
+        self.active = False
+        self.notified = False       # whether the current activation was announced
+        self.last_sent = -math.inf
+
+    def check(self, value, now):
+        """Return an alert line if this sample should be reported, else None."""
+        if value is None or math.isnan(value):
+            return None
+        if self.upper:
+            crossed, cleared = value > self.threshold, value < self.threshold - self.hysteresis
+        else:
+            crossed, cleared = value < self.threshold, value > self.threshold + self.hysteresis
+
+        if not self.armed:
+            self.armed = not crossed
+            return None
+        if not self.active:
+            if not crossed:
+                return None
+            self.active, self.notified = True, False
+        elif cleared:
+            self.active = False
+            return f"OK {self._describe(value)} back within {self._limit()}" if self.notified else None
+
+        if now - self.last_sent < self.cooldown:
+            return None
+        prefix = "STILL" if self.notified else "ALERT"
+        self.last_sent, self.notified = now, True
+        return f"{prefix} {self._describe(value)} {'above' if self.upper else 'below'} {self._limit()}"
+
+    def _describe(self, value):
+        probe = self.source.split("_")[0].upper()
+        return f"{probe} {value:+.1f}F/min" if self.source.endswith("_rate") else f"{probe} {value:.1f}F"
+
+    def _limit(self):
+        return f"{self.threshold:+.1f}F/min" if self.source.endswith("_rate") else f"{self.threshold:.0f}F"
+
+
+# ------------------- Engine -------------------
+class AlertEngine:
+    """
+    evaluate(now, values) -> message or None, once per sample.
+
+    `defaults` (the command-line limits) win over the file at startup; once
+    the file changes while running, its values win.
+    """
+
+    def __init__(self, path, defaults=None, cooldown=None, batch_seconds=ALERT_BATCH_SECONDS):
+        self.path = path
+        self.defaults = dict(defaults or {})
+        self.default_cooldown = load_default_cooldown() if cooldown is None else cooldown
+        self.batch_seconds = batch_seconds
+        self.limits = {}
+        self.rules = {}
+        self.reloads = 0
+        self.sent = 0
+        self._mtime = None
+        self._next_check = -math.inf
+        self._pending = []
+        self._pending_since = None
+        self._load(self._read_file(), initial=True)
+
+    def _read_file(self):
+        try:
+            self._mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path) as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            # e.g. caught mid-write; the next change (or check) reloads it
+            print(f"\n[ALERT] Could not read {self.path}: {e}")
+            self._mtime = None
+            return None
+
+    def _load(self, data, initial=False):
+        if data is None:
+            return
+        limits = {**data, **self.defaults} if initial else {**self.defaults, **data}
+        # The bars and the ETA read limits directly, so a bad value keeps the last good one
+        for key, value in list(limits.items()):
+            if (RULE_KEY.match(key) or key in NUMERIC_SETTINGS) and not is_number(value):
+                print(f"\n[ALERT] Ignoring {key}={value!r} in {self.path}: not a number")
+                if is_number(self.limits.get(key)):
+                    limits[key] = self.limits[key]
+                else:
+                    del limits[key]
+        self.limits = limits
+        cooldown = float(self.limits.get("alert_cooldown_seconds", self.default_cooldown))
+        rules = {}
+        for key, value in self.limits.items():
+            match = RULE_KEY.match(key)
+            if not match:
+                continue
+            probe, rate, side = match.groups()
+            hysteresis = float(self.limits.get("rate_hysteresis" if rate else "hysteresis",
+                                               RATE_HYSTERESIS if rate else TEMP_HYSTERESIS))
+            # Keep the state (active, last sent) of rules that survive a reload
+            rule = self.rules.get(key) or AlertRule(key, probe + ("_rate" if rate else ""), side == "upper",
+                                                    value, hysteresis, cooldown)
+            rule.threshold, rule.hysteresis, rule.cooldown = float(value), hysteresis, cooldown
+            rules[key] = rule
+        self.rules = rules
+
+    def maybe_reload(self, now):
+        if now < self._next_check:
+            return False
+        self._next_check = now + RELOAD_CHECK_SECONDS
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._load(self._read_file())
+        self.reloads += 1
+        return True
+
+    def evaluate(self, now, values):
+        """`values` maps 'meat', 'fire', 'meat_rate', 'fire_rate' (see windowed_rate) to the latest readings."""
+        self.maybe_reload(now)
+        for rule in self.rules.values():
+            line = rule.check(values.get(rule.source), now)
+            if line:
+                if not self._pending:
+                    self._pending_since = now
+                self._pending.append(line)
+        if self._pending and now - self._pending_since >= self.batch_seconds:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """The pending alerts as one message, or None."""
+        if not self._pending:
+            return None
+        message, self._pending = "\n".join(self._pending), []
+        self.sent += 1
+        return message
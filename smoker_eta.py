@@ -0,0 +1,100 @@
+"""Online cook ETA and stall detection for the meat probe.
+
+CookPredictor fits temperature = level + rate * (t - now) by least squares
+with exponential forgetting, i.e. recursive least squares with a forgetting
+factor. It keeps five weighted sums with times taken relative to the
+newest sample, so each update is a handful of multiplications and the fit
+never degrades as the cook gets longer. From the fit it estimates time to
+the target temperature and flags a stall while the meat plateaus.
+"""
+import math
+
+# ------------------- Config -------------------
+ETA_FIT_SECONDS = 15 * 60       # forgetting time constant of the fit
+ETA_MIN_SECONDS = 5 * 60        # history needed before an ETA is shown
+ETA_MIN_RATE = 0.02             # F/min; slower than this there is no meaningful ETA
+STALL_RATE = 0.1                # F/min; moving no faster than this either way, the meat is stalled...
+STALL_MIN_TEMP = 120            # ...once it is at least this hot (not just a cold start)
+STALL_EXIT_RATE = 2 * STALL_RATE  # hysteresis: the stall ends once it moves faster than this
+
+
+def format_duration(seconds):
+    if seconds is None or math.isnan(seconds):
+        return "--"
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}h{minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m"
+
+
+class CookPredictor:
+    """update(ts_seconds, temp) per sample; then eta_seconds(target), stalled, summary(target)."""
+
+    def __init__(self, fit_seconds=ETA_FIT_SECONDS):
+        self.tau = fit_seconds
+        self.ts = None
+        self.first_ts = None
+        # Weighted sums over samples i, with u_i = ts_i - ts (<= 0):
+        # w = sum(1), u = sum(u_i), uu = sum(u_i^2), y = sum(T_i), uy = sum(u_i * T_i)
+        self.w = self.u = self.uu = self.y = self.uy = 0.0
+        self.level = math.nan         # fitted temperature now
+        self.rate = math.nan          # fitted F/min
+        self.stalled = False
+        self.stall_start = None
+
+    def update(self, ts, temp):
+        if self.ts is None:
+            self.first_ts = ts
+            dt = 0.0
+        else:
+            dt = max(ts - self.ts, 0.0)
+        self.ts = ts
+
+        # Age the sums by dt (shift the time origin to now), forget, then add the sample at u = 0
+        decay = math.exp(-dt / self.tau)
+        self.uu = decay * (self.uu - 2 * dt * self.u + dt * dt * self.w)
+        self.uy = decay * (self.uy - dt * self.y)
+        self.u = decay * (self.u - dt * self.w)
+        self.w = decay * self.w + 1
+        self.y = decay * self.y + temp
+
+        det = self.w * self.uu - self.u * self.u
+        if det <= 1e-9:
+            self.level, self.rate = temp, math.nan
+            return
+        slope = (self.w * self.uy - self.u * self.y) / det      # F/s
+        self.level = (self.y - slope * self.u) / self.w
+        self.rate = slope * 60
+        self._update_stall()
+
+    def _update_stall(self):
+        if not self.ready:
+            return
+        # A plateau, not a falling temperature (pulled probe, resting meat, dying fire)
+        if self.stalled:
+            if abs(self.rate) > STALL_EXIT_RATE:
+                self.stalled, self.stall_start = False, None
+        elif abs(self.rate) <= STALL_RATE and self.level >= STALL_MIN_TEMP:
+            self.stalled, self.stall_start = True, self.ts
+
+    @property
+    def ready(self):
+        return self.ts is not None and self.ts - self.first_ts >= ETA_MIN_SECONDS
+
+    @property
+    def stall_seconds(self):
+        return self.ts - self.stall_start if self.stalled else 0.0
+
+    def eta_seconds(self, target):
+        """Seconds until `target` at the current rate; 0 once reached, None if unknown."""
+        if not self.ready or math.isnan(self.rate):
+            return None
+        if self.level >= target:
+            return 0.0
+        if self.rate < ETA_MIN_RATE:
+            return None
+        return (target - self.level) / self.rate * 60
+
+    def summary(self, target):
+        text = f"ETA {format_duration(self.eta_seconds(target))}"
+        if self.stalled:
+            text += f" STALL {format_duration(self.stall_seconds)}"
+        return text
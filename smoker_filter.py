@@ -0,0 +1,66 @@
+"""Low-lag smoothing of probe temperatures.
+
+A 60-sample moving average lags a change by ~30 s. ProbeFilter is a 1-D
+Kalman filter with a constant-rate model (state: temperature and its rate
+of change), so a steady climb is tracked without lag and a step shows up
+within a few samples. With a fixed sampling interval it converges to an
+alpha-beta filter; unlike one, it also copes with gaps from missed polls.
+"""
+import math
+
+# ------------------- Config -------------------
+# (process noise, measurement noise) per probe:
+#   process noise     - how fast the rate may change, (F/s^2)^2 * s; higher follows faster, smooths less
+#   measurement noise - variance of one reading, F^2
+DEFAULT_FILTER_NOISE = {
+    'meat': (1e-5, 0.25),
+    'fire': (1e-3, 4.0),
+}
+INITIAL_RATE_VARIANCE = 0.01    # (F/s)^2, i.e. +-6 F/min: how unsure the first rate estimate (0) is
+
+
+class ProbeFilter:
+    """update(ts, reading) -> (temperature, rate in F/min); O(1) per sample."""
+
+    def __init__(self, process_noise, measurement_noise):
+        self.q = process_noise
+        self.r = measurement_noise
+        self.ts = None
+        self.temp = math.nan
+        self.rate = 0.0                 # F/s internally
+        self.p00 = self.p01 = self.p11 = 0.0
+
+    @property
+    def rate_per_min(self):
+        return self.rate * 60
+
+    def update(self, ts, reading):
+        if self.ts is None:
+            self.ts, self.temp, self.rate = ts, reading, 0.0
+            self.p00, self.p01, self.p11 = self.r, 0.0, INITIAL_RATE_VARIANCE
+            return self.temp, 0.0
+
+        # Predict: temperature moves at the current rate for dt seconds
+        dt = max(ts - self.ts, 0.0)
+        self.ts = ts
+        q = self.q
+        self.temp += self.rate * dt
+        self.p00 += dt * (2 * self.p01 + dt * self.p11) + q * dt ** 3 / 3
+        self.p01 += dt * self.p11 + q * dt ** 2 / 2
+        self.p11 += q * dt
+
+        # Correct with the reading
+        s = self.p00 + self.r
+        k0, k1 = self.p00 / s, self.p01 / s
+        residual = reading - self.temp
+        self.temp += k0 * residual
+        self.rate += k1 * residual
+        self.p11 -= k1 * self.p01
+        self.p00, self.p01 = (1 - k0) * self.p00, (1 - k0) * self.p01
+        return self.temp, self.rate_per_min
+
+
+def make_filters(noise=None):
+    """ProbeFilter per probe name, with DEFAULT_FILTER_NOISE overridden by `noise`."""
+    settings = dict(DEFAULT_FILTER_NOISE, **(noise or {}))
+    return {probe: ProbeFilter(q, r) for probe, (q, r) in settings.items()}
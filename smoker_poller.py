@@ -0,0 +1,108 @@
+"""Keep-alive poller for the Wi-Fi smoker thermometer.
+
+The thermometer answers GET / with "meat,fire,air1,air2". One pooled
+requests.Session keeps the TCP connection open between samples, the
+connect and read timeouts add up to less than the monitors' 1 s sampling
+period, and after a failure the poller backs off with jitter by skipping
+polls instead of sleeping, so the sampling loop keeps its rhythm.
+"""
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ------------------- Config -------------------
+THERMOMETER_URL = "http://192.168.254.25"
+CONNECT_TIMEOUT_SECONDS = 0.3   # a LAN connect takes milliseconds
+READ_TIMEOUT_SECONDS = 0.6      # together: 0.9 s, inside one 1 s sampling period
+BACKOFF_BASE_SECONDS = 1
+BACKOFF_MAX_SECONDS = 30
+EXPECTED_VALUES = 4
+
+
+# ------------------- Stats -------------------
+class EndpointStats:
+    """Success rate and latency of one endpoint."""
+
+    def __init__(self, url):
+        self.url = url
+        self.attempts = 0
+        self.successes = 0
+        self.skipped = 0              # polls not sent because of backoff
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_ms = 0.0
+        self.avg_ms = 0.0             # exponential moving average of successful requests
+        self.max_ms = 0.0
+
+    @property
+    def success_pct(self):
+        return 100 * self.successes / self.attempts if self.attempts else 0
+
+    def record(self, ok, elapsed_ms, error=None):
+        self.attempts += 1
+        if ok:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.last_ms = elapsed_ms
+            self.avg_ms = elapsed_ms if self.successes == 1 else 0.9 * self.avg_ms + 0.1 * elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+        else:
+            self.consecutive_failures += 1
+            self.last_error = error
+
+    def summary(self):
+        return (f"{self.url}: {self.success_pct:.1f}% of {self.attempts} ok, "
+                f"{self.avg_ms:.0f} ms avg (max {self.max_ms:.0f}), {self.skipped} skipped")
+
+
+# ------------------- Poller -------------------
+class ThermometerPoller:
+    """
+    poll() returns [meat, fire, air1, air2] or None, and never blocks for
+    longer than the request timeouts.
+
+    After n consecutive failures the next request waits a random time up to
+    min(BACKOFF_MAX, BACKOFF_BASE * 2**(n-1)); polls in the meantime return
+    None straight away and are counted as skipped.
+    """
+
+    def __init__(self, url=THERMOMETER_URL, connect_timeout=CONNECT_TIMEOUT_SECONDS,
+                 read_timeout=READ_TIMEOUT_SECONDS, backoff_base=BACKOFF_BASE_SECONDS,
+                 backoff_max=BACKOFF_MAX_SECONDS):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = EndpointStats(url)
+        self._retry_at = 0.0
+
+        self.session = requests.Session()
+        # One connection, reused; retries are this class's job, not urllib3's
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def poll(self):
+        now = time.monotonic()
+        if now < self._retry_at:
+            self.stats.skipped += 1
+            return None
+        t0 = time.perf_counter()
+        try:
+            response = self.session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            values = [float(x) for x in response.text.strip().split(",")]
+            if len(values) != EXPECTED_VALUES:
+                raise ValueError(f"Expected {EXPECTED_VALUES} values from thermometer, got {len(values)}")
+        except (requests.RequestException, ValueError) as e:
+            self.stats.record(False, (time.perf_counter() - t0) * 1000, error=str(e))
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (self.stats.consecutive_failures - 1))
+            self._retry_at = time.monotonic() + random.uniform(0, delay)
+            return None
+        self.stats.record(True, (time.perf_counter() - t0) * 1000)
+        return values
+
+    def close(self):
+        self.session.close()
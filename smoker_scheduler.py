@@ -0,0 +1,97 @@
+"""Fixed-rate sampling clock and background worker for the smoker monitors.
+
+`sleep(interval)` after each sample stretches the period by however long
+the sample took. FixedRateScheduler instead sleeps until absolute
+deadlines on a time.monotonic() grid, so a slow sample only delays that
+tick; slow side work (database, files, Telegram) goes to a
+BackgroundWorker so it does not delay ticks at all.
+"""
+import queue
+import threading
+import time
+
+# ------------------- Config -------------------
+LATE_TOLERANCE_FRACTION = 0.1   # a tick later than this share of the interval counts as late
+WORKER_QUEUE_SIZE = 600         # pending side jobs before new ones are dropped
+
+
+# ------------------- Scheduler -------------------
+class FixedRateScheduler:
+    """
+    Iterating yields (tick, offset_seconds) with offset = tick * interval.
+
+    If the caller falls a whole interval or more behind, the missed ticks are
+    skipped (counted in `missed`) rather than fired in a burst, so the grid
+    stays aligned with wall time.
+    """
+
+    def __init__(self, interval, late_tolerance=None):
+        self.interval = interval
+        self.late_tolerance = interval * LATE_TOLERANCE_FRACTION if late_tolerance is None else late_tolerance
+        self.start = None
+        self.ticks = 0
+        self.late = 0
+        self.missed = 0
+        self.last_late_ms = 0.0
+        self.max_late_ms = 0.0
+
+    def __iter__(self):
+        self.start = time.monotonic()
+        tick = 0
+        while True:
+            deadline = self.start + tick * self.interval
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            lateness = time.monotonic() - deadline
+            if lateness >= self.interval:
+                skipped = int(lateness // self.interval)
+                self.missed += skipped
+                tick += skipped
+                lateness -= skipped * self.interval
+            if lateness > self.late_tolerance:
+                self.late += 1
+            self.ticks += 1
+            self.last_late_ms = lateness * 1000
+            self.max_late_ms = max(self.max_late_ms, self.last_late_ms)
+            yield tick, tick * self.interval
+            tick += 1
+
+    def summary(self):
+        return (f"{self.ticks} ticks at {self.interval:g} s, {self.late} late, {self.missed} missed, "
+                f"max {self.max_late_ms:.0f} ms late")
+
+
+# ------------------- Worker -------------------
+class BackgroundWorker:
+    """Runs submitted calls in order on one daemon thread; never blocks the submitter."""
+
+    def __init__(self, name, maxsize=WORKER_QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args):
+        try:
+            self.queue.put_nowait((fn, args))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5):
+        """Finish what is queued, then stop."""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            fn, args = job
+            try:
+                fn(*args)
+            except Exception as e:
+                self.errors += 1
+                print(f"\n[{self.thread.name}] {fn.__name__} failed: {e}")
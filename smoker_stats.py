@@ -0,0 +1,128 @@
+"""Time-windowed rolling statistics for the smoker probes.
+
+A window holds the samples of the last N seconds (not the last N samples),
+so missed polls shorten the sample count instead of stretching the window.
+Mean, variance and the least-squares slope come from running sums, min
+and max from monotonic deques; every add() and every query is O(1)
+amortized.
+"""
+import math
+from collections import deque
+
+# ------------------- Config -------------------
+ROLLING_WINDOWS_SECONDS = (60, 5 * 60, 15 * 60)
+
+
+# ------------------- Window -------------------
+class RollingWindow:
+    """Count, mean, variance, slope, min and max of the samples with ts > newest ts - seconds."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.samples = deque()       # (ts, value), oldest first
+        self._min = deque()          # increasing values: candidates for the minimum
+        self._max = deque()          # decreasing values: candidates for the maximum
+        self._shift = None           # sums are kept relative to the first value, which keeps
+        self._sum = 0.0              # sum-of-squares cancellation small at smoker temperatures
+        self._sumsq = 0.0
+        self._t0 = None              # likewise for times: sums of t, t^2 and t * value
+        self._sumt = 0.0             # are kept relative to the first timestamp
+        self._sumtt = 0.0
+        self._sumtv = 0.0
+
+    def add(self, ts, value):
+        if self._shift is None:
+            self._shift, self._t0 = value, ts
+        self.evict(ts)
+        self.samples.append((ts, value))
+        d = value - self._shift
+        self._sum += d
+        self._sumsq += d * d
+        t = ts - self._t0
+        self._sumt += t
+        self._sumtt += t * t
+        self._sumtv += t * d
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((ts, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((ts, value))
+
+    def evict(self, now):
+        """Drop samples that fell out of the window as of `now`."""
+        horizon = now - self.seconds
+        samples = self.samples
+        while samples and samples[0][0] <= horizon:
+            ts, value = samples.popleft()
+            d = value - self._shift
+            self._sum -= d
+            self._sumsq -= d * d
+            t = ts - self._t0
+            self._sumt -= t
+            self._sumtt -= t * t
+            self._sumtv -= t * d
+            if self._min[0][0] == ts:
+                self._min.popleft()
+            if self._max[0][0] == ts:
+                self._max.popleft()
+        if not samples:
+            # Resetting avoids carrying rounding error through an empty window
+            self._sum = self._sumsq = self._sumt = self._sumtt = self._sumtv = 0.0
+
+    def __len__(self):
+        return len(self.samples)
+
+    @property
+    def mean(self):
+        n = len(self.samples)
+        return self._shift + self._sum / n if n else math.nan
+
+    @property
+    def variance(self):
+        """Sample variance (n - 1); NaN with fewer than two samples."""
+        n = len(self.samples)
+        if n < 2:
+            return math.nan
+        return max(0.0, (self._sumsq - self._sum * self._sum / n) / (n - 1))
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def span(self):
+        """Seconds between the oldest and newest sample in the window."""
+        return self.samples[-1][0] - self.samples[0][0] if self.samples else 0.0
+
+    @property
+    def slope(self):
+        """Least-squares slope in value units per second; NaN until two timestamps differ."""
+        n = len(self.samples)
+        det = n * self._sumtt - self._sumt * self._sumt
+        if n < 2 or det <= 0:
+            return math.nan
+        return (n * self._sumtv - self._sumt * self._sum) / det
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else math.nan
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else math.nan
+
+
+# ------------------- Per probe -------------------
+class ProbeStats:
+    """Several RollingWindows over one probe, e.g. stats[60].mean for the 1-minute average."""
+
+    def __init__(self, windows=ROLLING_WINDOWS_SECONDS):
+        self.windows = {seconds: RollingWindow(seconds) for seconds in windows}
+
+    def add(self, ts, value):
+        for window in self.windows.values():
+            window.add(ts, value)
+
+    def __getitem__(self, seconds):
+        return self.windows[seconds]
@@ -0,0 +1,95 @@
+"""Live status channel from the smoker monitor to readers such as telegram_listener.py.
+
+The monitor publishes its current temperatures to STATUS_FILE, a small
+fixed-layout binary record, instead of rewriting temp_limits.json every
+second. A write goes to a temporary file that is renamed over the old one,
+so a reader always sees a whole record. It only happens when a value moved
+past its deadband since the last write (at most every
+STATUS_MIN_INTERVAL_SECONDS), or every STATUS_REFRESH_SECONDS so readers
+can tell a stable cook from a stopped monitor. Readers unpack one struct.
+"""
+import math
+import os
+import struct
+import time
+from collections import namedtuple
+
+# ------------------- Config -------------------
+STATUS_FILE = "smoker_status.bin"
+STATUS_TEMP_DEADBAND = 0.5      # F; smaller temperature changes do not cause a write
+STATUS_RATE_DEADBAND = 0.5      # F/min
+STATUS_ETA_DEADBAND = 60        # seconds
+STATUS_MIN_INTERVAL_SECONDS = 5
+STATUS_REFRESH_SECONDS = 60     # rewrite unchanged values this often
+STATUS_STALE_SECONDS = 3 * STATUS_REFRESH_SECONDS
+
+STATUS_MAGIC = b"SMKS"
+STATUS_VERSION = 1
+STATUS_FORMAT = struct.Struct("<4sB?2xd8f")
+Status = namedtuple("Status", "stalled updated meat_avg fire_avg meat fire meat_rate fire_rate eta_seconds meat_upper")
+
+
+# ------------------- Writer -------------------
+class StatusWriter:
+    """publish(...) writes a new record if anything changed; returns whether it wrote."""
+
+    # Per field of Status after `updated`
+    DEADBANDS = (STATUS_TEMP_DEADBAND,) * 4 + (STATUS_RATE_DEADBAND,) * 2 + (STATUS_ETA_DEADBAND, 0)
+
+    def __init__(self, path=STATUS_FILE, min_interval=STATUS_MIN_INTERVAL_SECONDS, refresh=STATUS_REFRESH_SECONDS):
+        self.path = path
+        self.min_interval = min_interval
+        self.refresh = refresh
+        self.writes = 0
+        self.skipped = 0
+        self._last = None
+        self._last_write = 0.0
+
+    def publish(self, meat_avg, fire_avg, meat, fire, meat_rate, fire_rate, eta_seconds=None, meat_upper=math.nan,
+                stalled=False):
+        values = (meat_avg, fire_avg, meat, fire, meat_rate, fire_rate,
+                  math.nan if eta_seconds is None else eta_seconds, meat_upper)
+        now = time.time()
+        since = now - self._last_write
+        if since < self.refresh and (since < self.min_interval or not self._changed(stalled, values)):
+            self.skipped += 1
+            return False
+        record = STATUS_FORMAT.pack(STATUS_MAGIC, STATUS_VERSION, stalled, now, *values)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(record)
+        os.replace(tmp_path, self.path)     # atomic: readers see the old or the new record
+        self._last, self._last_write = (stalled, values), now
+        self.writes += 1
+        return True
+
+    def _changed(self, stalled, values):
+        if self._last is None or stalled != self._last[0]:
+            return True
+        for value, last, band in zip(values, self._last[1], self.DEADBANDS):
+            if math.isnan(value) or math.isnan(last):
+                if math.isnan(value) != math.isnan(last):
+                    return True
+            elif abs(value - last) > band:
+                return True
+        return False
+
+
+# ------------------- Reader -------------------
+def read_status(path=STATUS_FILE):
+    """The latest Status, or None if no monitor has published one."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(STATUS_FORMAT.size)
+    except FileNotFoundError:
+        return None
+    if len(data) != STATUS_FORMAT.size:
+        return None
+    magic, version, *fields = STATUS_FORMAT.unpack(data)
+    if magic != STATUS_MAGIC or version != STATUS_VERSION:
+        return None
+    return Status(*fields)
+
+
+def status_age(status):
+    return time.time() - status.updated
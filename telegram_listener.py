@@ -9,6 +9,8 @@ from telegram_utils import get_updates, send_message, send_photo, load_bot_confi
 from nfl_schedule import fetch_nfl_schedule
 from steelers_report import get_scoreboard
 from fun_fetcher import get_fun_content  # <-- import joke/quote/fact fetcher
+from smoker_status import read_status, status_age, STATUS_STALE_SECONDS
+from smoker_eta import format_duration
 
 
 BOT_NAME = os.getenv("TELEGRAM_BOT_NAME", "weather_bot")
@@ -111,17 +113,23 @@ while True:
                         send_message(f"Current limits:\n{msg}", bot_token, chat_id)
                     
                     elif cmd == "temps":
+                        # Live temps come from the monitor's status file, not temp_limits.json
                         try:
-                            with open(TEMP_LIMITS_FILE, "r") as f:
-                                data = json.load(f)
-                            meat_avg = data.get("meat_avg")
-                            fire_avg = data.get("fire_avg")
-                            if meat_avg is None or fire_avg is None:
+                            status = read_status()
+                            if status is None:
                                 send_message("⚠️ Rolling-average temps not yet available.", bot_token, chat_id)
                             else:
-                                send_message(f"🥩 Meat avg: {meat_avg:.1f}°F\n🔥 Fire avg: {fire_avg:.1f}°F", bot_token, chat_id)
+                                msg = (f"🥩 Meat: {status.meat:.1f}°F ({status.meat_rate:+.1f}°F/min), avg {status.meat_avg:.1f}°F\n"
+                                       f"🔥 Fire: {status.fire:.1f}°F ({status.fire_rate:+.1f}°F/min), avg {status.fire_avg:.1f}°F\n"
+                                       f"⏱ ETA to {status.meat_upper:.0f}°F: {format_duration(status.eta_seconds)}")
+                                if status.stalled:
+                                    msg += " (stalled)"
+                                age = status_age(status)
+                                if age > STATUS_STALE_SECONDS:
+                                    msg += f"\n⚠️ Last update {format_duration(age)} ago; is the monitor running?"
+                                send_message(msg, bot_token, chat_id)
                         except Exception as e:
-                            send_message(f"⚠️ Failed to read rolling-average temps: {e}", bot_token, chat_id)
+                            send_message(f"⚠️ Failed to read live temps: {e}", bot_token, chat_id)
 
                     elif cmd == "weather":
                         send_message("Fetching NOAA weather forecast...", bot_token, chat_id)
@@ -210,7 +218,7 @@ while True:
                             "Available commands:\n"
                             "setlimit <name> <value> - update a temperature limit\n"
                             "getlimits - view current limits\n"
-                            "temps - view rolling average temps\n"
+                            "temps - view live and rolling average temps\n"
                             "weather - get NOAA weather forecast\n"
                             "nfl / football - get upcoming NFL schedule\n"
                             "steelers - Steelers game report (if available)\n"
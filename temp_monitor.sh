@@ -73,13 +73,14 @@ echo "Fire Lower Limit: ${YELLOW}$fire_lower${NC}"
 echo "Meat Upper Limit: ${YELLOW}$meat_upper${NC}"
 echo "Notes: ${YELLOW}$notes${NC}"
 
-# --- Save updated limits to JSON ---
-jq -n \
+# --- Save updated limits to JSON (other keys, e.g. rate alert rules, are kept) ---
+[[ -f "$LIMITS_FILE" ]] || echo '{}' > "$LIMITS_FILE"
+jq \
     --arg fu "$fire_upper" \
     --arg fl "$fire_lower" \
     --arg mu "$meat_upper" \
-    '{fire_upper: ($fu|tonumber), fire_lower: ($fl|tonumber), meat_upper: ($mu|tonumber)}' \
-    > "$LIMITS_FILE"
+    'del(.fire_avg, .meat_avg) + {fire_upper: ($fu|tonumber), fire_lower: ($fl|tonumber), meat_upper: ($mu|tonumber)}' \
+    "$LIMITS_FILE" > "$LIMITS_FILE.tmp" && mv "$LIMITS_FILE.tmp" "$LIMITS_FILE"
 
 # --- Run Python script ---
 python3 chatgpt_temp_monitor3.py "$dbfile" \